@@ -1,5 +1,5 @@
 from fastapi import Request, HTTPException
-from ..core.security import verify_token
+from ..db.async_repository import verify_token
 
 async def get_current_username(request: Request) -> str:
     """
@@ -30,7 +30,7 @@ async def get_current_username(request: Request) -> str:
                 detail="Empty token"
             )
         
-        username = verify_token(token)
+        username = await verify_token(token)
         
         if not username:
             raise HTTPException(
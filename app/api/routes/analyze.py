@@ -1,16 +1,25 @@
 # app/api/routes/analyze.py
+import asyncio
 import datetime
+import itertools
+import json
 import logging
-from fastapi import APIRouter, HTTPException, Depends
+import tempfile
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 
 from ...models.schemas import AnalyzeRequest, AnalyzeUrlRequest
 from ...api.deps import get_current_username
-from ...db.repository import add_history_db
+from ...db.history_writer import history_writer
 from ...core.config import settings
 
 from ...services.scoring import score_text, score_url
+from ...services.blocklist import blocklist
 from ...services.safe_browsing import check_url_google_safe_browsing
 from ...services.gemini_client import analyze_text as gemini_analyze_text, analyze_url as gemini_analyze_url
+from ...services.singleflight import provider_flights
+from ...services.circuit_breaker import CANCEL_DEADLINE, CANCEL_DECIDED
+from ...services.verdict_cache import normalize_content
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -19,67 +28,225 @@ router = APIRouter()
 async def analyze_text_route(request: AnalyzeRequest, username: str = Depends(get_current_username)):
     """
     Analiza TEXTO:
-      1) Intenta Gemini (si está configurado)
-      2) Fallback a heurística local
+      1) Heurística local (siempre, es inmediata)
+      2) Si la heurística no es concluyente, intenta Gemini (si está configurado)
+      3) Fallback a la heurística local si Gemini falla
     Registra el resultado en la tabla 'history'.
     """
     text = (request.text or "").strip()
     if not text:
         raise HTTPException(status_code=400, detail="Texto vacío")
 
-    verdict: str
-    percentage: int
-    reasons: list
-    url_results: list
+    async for _, response in _text_events(text):
+        pass
 
-    # 1) Intento con Gemini (si hay configuración)
+    await history_writer.enqueue(_history_entry(username, "texto", text, response["combined_verdict"], response["percentage"]))
+    return response
+
+
+@router.post("/analyze/stream")
+async def analyze_text_stream_route(request: AnalyzeRequest, username: str = Depends(get_current_username)):
+    """
+    Igual que /analyze pero por Server-Sent Events: emite primero el veredicto
+    de la heurística local ("local") y cierra con el resultado guardado en el
+    historial ("final").
+    """
+    text = (request.text or "").strip()
+    if not text:
+        raise HTTPException(status_code=400, detail="Texto vacío")
+
+    async def stream():
+        async for event, response in _text_events(text):
+            if event == "final":
+                await history_writer.enqueue(_history_entry(
+                    username, "texto", text, response["combined_verdict"], response["percentage"]
+                ))
+            yield _sse(event, response)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+@router.post("/analyze/batch")
+async def analyze_batch_route(request: Request, username: str = Depends(get_current_username)):
+    """
+    Análisis masivo. Entrada NDJSON, un objeto por línea: {"text": "..."} o {"url": "..."}.
+    Salida NDJSON en orden de finalización: {"index", "type", ...respuesta} o
+    {"index", "error"} por línea.
+
+    El cuerpo se vuelca a un fichero temporal (en memoria hasta
+    BATCH_SPOOL_MEMORY_BYTES, después a disco) y se procesa con como mucho
+    BATCH_CONCURRENCY análisis en vuelo, así que la memoria no depende del
+    tamaño de la subida. El historial pasa por la cola write-behind.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=settings.BATCH_SPOOL_MEMORY_BYTES, mode="w+b")
+    async for chunk in request.stream():
+        spool.write(chunk)
+    spool.seek(0)
+
+    return StreamingResponse(_batch_results(spool, username), media_type="application/x-ndjson")
+
+
+async def _batch_results(spool, username: str):
+    results: asyncio.Queue = asyncio.Queue(maxsize=settings.BATCH_CONCURRENCY * 2)
+    slots = asyncio.Semaphore(settings.BATCH_CONCURRENCY)
+
+    async def analyze_one(index: int, line: bytes):
+        try:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                await results.put(({"index": index, "error": "JSON inválido"}, None))
+                return
+            if isinstance(item, dict) and isinstance(item.get("url"), str) and item["url"].strip():
+                url = item["url"].strip()
+                async for _, response in _url_events(url):
+                    pass
+                entry = _history_entry(username, "url", url, response["verdict"], None)
+                await results.put(({"index": index, "type": "url", **response}, entry))
+            elif isinstance(item, dict) and isinstance(item.get("text"), str) and item["text"].strip():
+                text = item["text"].strip()
+                async for _, response in _text_events(text):
+                    pass
+                entry = _history_entry(username, "texto", text, response["combined_verdict"], response["percentage"])
+                await results.put(({"index": index, "type": "texto", **response}, entry))
+            else:
+                await results.put(({"index": index, "error": "Se esperaba 'text' o 'url'"}, None))
+        except Exception as e:
+            logger.error(f"Error en análisis por lotes (línea {index}): {e}")
+            await results.put(({"index": index, "error": str(e)}, None))
+        finally:
+            slots.release()
+
+    async def produce():
+        tasks = set()
+        try:
+            for index, line in enumerate(_iter_ndjson_lines(spool, settings.BATCH_MAX_LINE_BYTES)):
+                if line is None:
+                    await results.put(({"index": index, "error": "Línea demasiado larga"}, None))
+                    continue
+                if not line.strip():
+                    continue
+                await slots.acquire()
+                task = asyncio.create_task(analyze_one(index, line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        except Exception as e:
+            # Fallo leyendo el cuerpo: se informa en una línea y se cierra el flujo
+            logger.error(f"Error leyendo el lote: {e}")
+            await results.put(({"index": None, "error": f"Error leyendo el lote: {e}"}, None))
+        finally:
+            for task in tasks:
+                task.cancel()
+        # Siempre hay centinela (salvo cancelación, cuando ya nadie consume)
+        await results.put(None)
+
+    producer = asyncio.create_task(produce())
     try:
-        result = await gemini_analyze_text(
-            text,
-            gemini_key=settings.GEMINI_API_KEY,
-            gemini_url=settings.GEMINI_API_URL
+        while True:
+            item = await results.get()
+            if item is None:
+                break
+            out, entry = item
+            if entry is not None:
+                await history_writer.enqueue(entry)
+            yield json.dumps(out, ensure_ascii=False) + "\n"
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+        spool.close()
+
+
+def _iter_ndjson_lines(f, max_bytes: int):
+    """Lee líneas de `f` sin cargar más de `max_bytes` por línea; None si una línea excede el límite."""
+    while True:
+        line = f.readline(max_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_bytes and not line.endswith(b"\n"):
+            # Descartar el resto de la línea
+            while line and not line.endswith(b"\n"):
+                line = f.readline(max_bytes + 1)
+            yield None
+            continue
+        yield line
+
+
+async def _text_events(text: str):
+    """
+    Pipeline de análisis de texto como generador de eventos (nombre, respuesta):
+    "local" con la heurística y "final" con el veredicto definitivo.
+    """
+    local = score_text(text)
+    gemini_configured = bool(settings.GEMINI_API_KEY and settings.GEMINI_API_URL)
+    decided = gemini_configured and _text_verdict_is_decided(local)
+
+    pending = ["gemini"] if gemini_configured and not decided else []
+    yield "local", _text_response(local, partial=True, pending=pending)
+
+    # 1) Heurística extrema → no merece la pena esperar a Gemini
+    if decided:
+        logger.info(f"Heurística local concluyente ({local['percentage']}%), se omite Gemini")
+        yield "final", _text_response(local, skipped=["gemini"])
+        return
+
+    # 2) Intento con Gemini (si hay configuración)
+    try:
+        # Peticiones simultáneas con el mismo texto comparten una sola llamada
+        result = await provider_flights.do(
+            ("gemini_text", normalize_content("texto", text)),
+            lambda: gemini_analyze_text(
+                text,
+                gemini_key=settings.GEMINI_API_KEY,
+                gemini_url=settings.GEMINI_API_URL
+            )
         )
-        verdict = result.get("verdict", "Sospechoso")
         try:
             percentage = int(result.get("percentage", 0))
         except Exception:
             percentage = 0
-        reasons = result.get("reasons", []) or []
-        url_results = result.get("url_results", []) or []
+        result = {
+            "verdict": result.get("verdict", "Sospechoso"),
+            "percentage": percentage,
+            "reasons": result.get("reasons", []) or [],
+            "url_results": result.get("url_results", []) or [],
+        }
     except RuntimeError:
         # Gemini no configurado → heurística local
-        local = score_text(text)
-        verdict = local["verdict"]
-        percentage = int(local["percentage"])
-        reasons = local["reasons"]
-        url_results = local["url_results"]
+        result = local
     except Exception as e:
         # Error en la llamada a Gemini → heurística local
         logger.warning(f"Error llamando a Gemini analyze_text: {e}")
-        local = score_text(text)
-        verdict = local["verdict"]
-        percentage = int(local["percentage"])
-        reasons = [f"Fallback local por error de proveedor: {e}"] + local["reasons"]
-        url_results = local["url_results"]
-
-    # Guardar en historial
-    entry = {
-        "username": username,
-        "type": "texto",
-        "input": text,
-        "verdict": verdict,
-        "percentage": percentage,
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    add_history_db(entry)
+        result = {**local, "reasons": [f"Fallback local por error de proveedor: {e}"] + local["reasons"]}
 
-    return {
-        "combined_verdict": verdict,
-        "percentage": percentage,
+    yield "final", _text_response(result)
+
+
+def _text_response(result: dict, partial: bool = False, pending: list | None = None,
+                   skipped: list | None = None) -> dict:
+    response = {
+        "combined_verdict": result["verdict"],
+        "percentage": int(result["percentage"]),
         "url_results": [{"url": u.get("url"), "verdict": u.get("verdict"), "reason": u.get("reason")}
-                        for u in (url_results or [])],
-        "reasons": reasons,
+                        for u in (result["url_results"] or [])],
+        "reasons": result["reasons"],
+        "skipped": skipped or [],
     }
+    if partial:
+        response.update({"partial": True, "pending": pending or []})
+    return response
+
+
+def _text_verdict_is_decided(local: dict) -> bool:
+    """
+    True si el porcentaje de la heurística local es extremo (ver TEXT_DECISIVE_*)
+    o si algún enlace está en la lista de bloqueo local.
+    """
+    if any(u.get("blocklist_match") for u in local["url_results"]):
+        return True
+    pct = local["percentage"]
+    return pct >= settings.TEXT_DECISIVE_HIGH or pct <= settings.TEXT_DECISIVE_LOW
 
 
 @router.post("/analyze_url")
@@ -90,15 +257,52 @@ async def analyze_url_route(request: AnalyzeUrlRequest, username: str = Depends(
       2) Google Safe Browsing (si está configurado)
       3) Gemini AI (si está configurado)
     
+    Los proveedores remotos (2 y 3) se consultan en paralelo con un deadline
+    global (ANALYZE_DEADLINE_SECONDS); los que no respondan a tiempo se
+    descartan y se indican en "timed_out".
+
     Combina los veredictos con un sistema de puntuación para mayor precisión.
     """
     url = (request.url or "").strip()
     if not url:
         raise HTTPException(status_code=400, detail="URL vacía")
 
+    async for _, response in _url_events(url):
+        pass
+
+    await history_writer.enqueue(_history_entry(username, "url", url, response["verdict"], None))
+    return response
+
+
+@router.post("/analyze_url/stream")
+async def analyze_url_stream_route(request: AnalyzeUrlRequest, username: str = Depends(get_current_username)):
+    """
+    Igual que /analyze_url pero por Server-Sent Events: emite la heurística
+    local ("local"), un veredicto combinado actualizado cada vez que responde
+    un proveedor ("update") y cierra con el resultado guardado ("final").
+    """
+    url = (request.url or "").strip()
+    if not url:
+        raise HTTPException(status_code=400, detail="URL vacía")
+
+    async def stream():
+        async for event, response in _url_events(url):
+            if event == "final":
+                await history_writer.enqueue(_history_entry(username, "url", url, response["verdict"], None))
+            yield _sse(event, response)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers=_SSE_HEADERS)
+
+
+async def _url_events(url: str):
+    """
+    Pipeline de análisis de URL como generador de eventos (nombre, respuesta):
+    "local", un "update" por proveedor que responde y "final".
+    """
     # Resultados de cada método
     results = {
         "heuristic": None,
+        "blocklist": None,
         "safe_browsing": None,
         "gemini": None
     }
@@ -115,66 +319,187 @@ async def analyze_url_route(request: AnalyzeUrlRequest, username: str = Depends(
     except Exception as e:
         logger.error(f"Error en heurística local: {e}")
 
-    # 2) Intentar Google Safe Browsing (si está configurado)
-    if settings.GOOGLE_SAFE_BROWSING_API_KEY:
-        try:
-            gsb = await check_url_google_safe_browsing(url)
-            results["safe_browsing"] = {
-                "verdict": gsb.get("verdict", "Desconocido"),
-                "reason": gsb.get("reason", "")
-            }
-            logger.info(f"Google Safe Browsing para {url}: {gsb.get('verdict')}")
-        except RuntimeError as e:
-            logger.warning(f"Google Safe Browsing no configurado: {e}")
-        except Exception as e:
-            logger.error(f"Error llamando a Google Safe Browsing: {e}")
+    # 1b) Lista de bloqueo local (sin red, microsegundos)
+    if blocklist.loaded:
+        match = blocklist.check_url(url)
+        results["blocklist"] = {
+            "verdict": "Maliciosa" if match else "Segura",
+            "reason": f"Coincide con {match['entry']}" if match else "No está en la lista de bloqueo local",
+        }
 
-    # 3) Intentar Gemini (si está configurado)
+    # 2) y 3) Proveedores remotos EN PARALELO con un deadline global
+    # (peticiones simultáneas con la misma URL comparten la llamada a cada proveedor)
+    flight_url = normalize_content("url", url)
+    providers = {}
+    if settings.GOOGLE_SAFE_BROWSING_API_KEY:
+        providers["safe_browsing"] = provider_flights.do(
+            ("safe_browsing", flight_url), lambda: _run_safe_browsing(url)
+        )
     if settings.GEMINI_API_KEY and settings.GEMINI_API_URL:
-        try:
-            g = await gemini_analyze_url(
-                url,
-                gemini_key=settings.GEMINI_API_KEY,
-                gemini_url=settings.GEMINI_API_URL
-            )
-            results["gemini"] = {
-                "verdict": g.get("verdict", "Desconocido"),
-                "reason": g.get("reason", ""),
-                "score": g.get("score", 50)
-            }
-            logger.info(f"Gemini AI para {url}: {g.get('verdict')}")
-        except Exception as e:
-            logger.error(f"Error llamando a Gemini analyze_url: {e}")
+        providers["gemini"] = provider_flights.do(
+            ("gemini_url", flight_url), lambda: _run_gemini_url(url)
+        )
+
+    # Si lo local ya decide (p. ej. URL en la lista de bloqueo), no se consulta fuera
+    skipped_early = []
+    if providers and _url_verdict_is_decided(results, sorted(providers)):
+        for coro in providers.values():
+            coro.close()
+        skipped_early, providers = sorted(providers), {}
+
+    pending = set(providers)
+    yield "local", _url_response(results, url, partial=True, pending=sorted(pending))
+
+    outcome = {}
+    async for name in _iter_with_deadline(
+        providers, results, settings.ANALYZE_DEADLINE_SECONDS,
+        is_decided=_url_verdict_is_decided, outcome=outcome
+    ):
+        pending.discard(name)
+        if pending:
+            yield "update", _url_response(results, url, partial=True, pending=sorted(pending))
+
+    timed_out, skipped = outcome["timed_out"], outcome["skipped"] or skipped_early
+    if timed_out:
+        logger.warning(f"Proveedores sin respuesta antes del deadline para {url}: {timed_out}")
+    if skipped:
+        logger.info(f"Veredicto decidido para {url}, proveedores cancelados: {skipped}")
 
     # 4) COMBINAR RESULTADOS con sistema de puntuación
-    final_verdict, final_reason = _combine_url_verdicts(results, url)
+    yield "final", _url_response(results, url, timed_out=timed_out, skipped=skipped)
 
-    # Guardar en historial
-    entry = {
-        "username": username,
-        "type": "url",
-        "input": url,
-        "verdict": final_verdict,
-        "percentage": None,
-        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    }
-    add_history_db(entry)
 
-    # Respuesta con detalles de cada método
-    return {
+def _url_response(results: dict, url: str, partial: bool = False, pending: list | None = None,
+                  timed_out: list | None = None, skipped: list | None = None) -> dict:
+    """Respuesta con el veredicto combinado y los detalles de cada método."""
+    final_verdict, final_reason = _combine_url_verdicts(results, url)
+    response = {
         "verdict": final_verdict,
         "reason": final_reason,
         "details": {
             "heuristic": results["heuristic"],
+            "blocklist": results["blocklist"],
             "safe_browsing": results["safe_browsing"],
             "gemini": results["gemini"]
         },
         "provider_tried": {
             "heuristic": results["heuristic"] is not None,
+            "blocklist": results["blocklist"] is not None,
             "gemini": results["gemini"] is not None,
             "google_safe_browsing": results["safe_browsing"] is not None
-        }
+        },
+        "timed_out": timed_out or [],
+        "skipped": skipped or []
     }
+    if partial:
+        response.update({"partial": True, "pending": pending or []})
+    return response
+
+
+def _history_entry(username: str, kind: str, content: str, verdict: str, percentage: int | None) -> dict:
+    return {
+        "username": username,
+        "type": kind,
+        "input": content,
+        "verdict": verdict,
+        "percentage": percentage,
+        "timestamp": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _run_safe_browsing(url: str) -> dict | None:
+    """Consulta Google Safe Browsing y adapta el resultado al formato de `results`."""
+    try:
+        gsb = await check_url_google_safe_browsing(url)
+        logger.info(f"Google Safe Browsing para {url}: {gsb.get('verdict')}")
+        return {
+            "verdict": gsb.get("verdict", "Desconocido"),
+            "reason": gsb.get("reason", "")
+        }
+    except RuntimeError as e:
+        logger.warning(f"Google Safe Browsing no configurado: {e}")
+    except Exception as e:
+        logger.error(f"Error llamando a Google Safe Browsing: {e}")
+    return None
+
+
+async def _run_gemini_url(url: str) -> dict | None:
+    """Consulta Gemini para una URL y adapta el resultado al formato de `results`."""
+    try:
+        g = await gemini_analyze_url(
+            url,
+            gemini_key=settings.GEMINI_API_KEY,
+            gemini_url=settings.GEMINI_API_URL
+        )
+        logger.info(f"Gemini AI para {url}: {g.get('verdict')}")
+        return {
+            "verdict": g.get("verdict", "Desconocido"),
+            "reason": g.get("reason", ""),
+            "score": g.get("score", 50)
+        }
+    except Exception as e:
+        logger.error(f"Error llamando a Gemini analyze_url: {e}")
+    return None
+
+
+async def _iter_with_deadline(
+    providers: dict,
+    results: dict,
+    deadline: float,
+    is_decided=None,
+    outcome: dict | None = None
+):
+    """
+    Ejecuta las corrutinas de `providers` (nombre -> corrutina) a la vez y
+    guarda en `results` lo que haya terminado antes de `deadline` segundos,
+    generando el nombre de cada proveedor según va respondiendo.
+    Las que no terminan a tiempo se cancelan.
+
+    Si se pasa `is_decided(results, pending)` y devuelve True tras completarse
+    algún proveedor, el resto se cancela porque ya no puede cambiar el veredicto.
+
+    Al terminar deja en `outcome` las listas "timed_out" (agotaron el
+    deadline) y "skipped" (canceladas por decisión anticipada).
+    """
+    outcome = outcome if outcome is not None else {}
+    outcome.update({"timed_out": [], "skipped": []})
+    if not providers:
+        return
+
+    loop = asyncio.get_running_loop()
+    end = loop.time() + deadline
+    tasks = {asyncio.create_task(coro): name for name, coro in providers.items()}
+    pending = set(tasks)
+
+    try:
+        while pending:
+            remaining = end - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[tasks[task]] = task.result()
+            for task in done:
+                yield tasks[task]
+            if pending and is_decided and is_decided(results, sorted(tasks[t] for t in pending)):
+                outcome["skipped"] = sorted(tasks[t] for t in pending)
+                break
+        if pending and not outcome["skipped"]:
+            outcome["timed_out"] = sorted(tasks[t] for t in pending)
+    finally:
+        # El motivo llega al circuit breaker: solo el deadline cuenta como llamada mala
+        reason = CANCEL_DECIDED if outcome["skipped"] else CANCEL_DEADLINE if outcome["timed_out"] else None
+        for task in pending:
+            task.cancel(reason)
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
 
 
 def _combine_url_verdicts(results: dict, url: str) -> tuple[str, str]:
@@ -183,12 +508,24 @@ def _combine_url_verdicts(results: dict, url: str) -> tuple[str, str]:
     
     Pesos:
     - Heurística local: 1
+    - Lista de bloqueo local: 5 si la URL está listada (feeds propios)
     - Google Safe Browsing: 3 (muy confiable para amenazas conocidas)
     - Gemini: 2 (IA general)
     
     Returns:
         (verdict, reason) tuple
     """
+    scores, reasons = _score_url_verdicts(results)
+    final_verdict = _final_url_verdict(scores)
+    final_reason = " | ".join(reasons) if reasons else "Sin información suficiente"
+
+    logger.info(f"Veredicto combinado para {url}: {final_verdict} (scores: {scores})")
+
+    return final_verdict, final_reason
+
+
+def _score_url_verdicts(results: dict) -> tuple[dict, list]:
+    """Acumula los puntos ponderados de cada fuente. Devuelve (scores, reasons)."""
     scores = {
         "Segura": 0,
         "Sospechosa": 0,
@@ -204,6 +541,11 @@ def _combine_url_verdicts(results: dict, url: str) -> tuple[str, str]:
         scores[verdict] += 1
         reasons.append(f"Heurística: {verdict} - {h['reason']}")
     
+    # Lista de bloqueo local: solo cuenta si la URL está listada
+    if results.get("blocklist") and results["blocklist"]["verdict"] == "Maliciosa":
+        scores["Maliciosa"] += 5
+        reasons.append(f"⛔ Lista de bloqueo local: {results['blocklist']['reason']}")
+    
     # Google Safe Browsing (peso 3 - muy confiable)
     if results["safe_browsing"]:
         sb = results["safe_browsing"]
@@ -235,19 +577,47 @@ def _combine_url_verdicts(results: dict, url: str) -> tuple[str, str]:
         
         scores[verdict] += 2
         reasons.append(f"Gemini AI: {verdict} - {g['reason']}")
-    
-    # Determinar veredicto final
+
+    return scores, reasons
+
+
+def _final_url_verdict(scores: dict) -> str:
+    """Decide el veredicto final a partir de los puntos acumulados."""
     if scores["Maliciosa"] >= 2:  # Al menos 2 puntos hacia maliciosa
-        final_verdict = "Maliciosa"
+        return "Maliciosa"
     elif scores["Sospechosa"] >= 2 or (scores["Maliciosa"] > 0 and scores["Segura"] > 0):
-        final_verdict = "Sospechosa"
+        return "Sospechosa"
     elif scores["Segura"] > scores["Maliciosa"] + scores["Sospechosa"]:
-        final_verdict = "Segura"
+        return "Segura"
     else:
-        final_verdict = "Sospechosa"  # Por defecto, ser cauteloso
-    
-    final_reason = " | ".join(reasons) if reasons else "Sin información suficiente"
-    
-    logger.info(f"Veredicto combinado para {url}: {final_verdict} (scores: {scores})")
-    
-    return final_verdict, final_reason
\ No newline at end of file
+        return "Sospechosa"  # Por defecto, ser cauteloso
+
+
+# Resultados posibles de cada proveedor remoto (None = sin respuesta). Sirven
+# para comprobar si el veredicto combinado todavía puede cambiar.
+_POSSIBLE_OUTCOMES = {
+    "safe_browsing": [
+        None,
+        {"verdict": "Maliciosa", "reason": ""},
+        {"verdict": "Segura", "reason": ""},
+    ],
+    "gemini": [
+        None,
+        {"verdict": "Segura", "reason": "", "score": 0},
+        {"verdict": "Sospechosa", "reason": "", "score": 50},
+        {"verdict": "Maliciosa", "reason": "", "score": 100},
+    ],
+}
+
+
+def _url_verdict_is_decided(results: dict, pending: list[str]) -> bool:
+    """
+    True si ningún resultado posible de los proveedores `pending` puede
+    cambiar el veredicto que se obtendría con los `results` actuales.
+    """
+    current = _final_url_verdict(_score_url_verdicts(results)[0])
+    for combo in itertools.product(*(_POSSIBLE_OUTCOMES[name] for name in pending)):
+        hypothetical = {**results, **dict(zip(pending, combo))}
+        if _final_url_verdict(_score_url_verdicts(hypothetical)[0]) != current:
+            return False
+    return True
\ No newline at end of file
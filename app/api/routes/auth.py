@@ -1,14 +1,15 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Depends
 from ...models.schemas import Credentials
-from ...core.security import (
-    create_user, 
-    create_session, 
-    verify_password, 
+from ...core.password_pool import password_pool, PasswordPoolBusy
+from ...api.deps import get_current_username
+from ...db.async_repository import (
+    create_user,
+    create_session,
     delete_session,
-    verify_token
+    verify_token,
+    get_user_credentials_db,
+    clear_history_db
 )
-from ...db.database import get_db_conn
-from ...db.repository import clear_history_db
 
 router = APIRouter()
 
@@ -19,7 +20,10 @@ async def signup(creds: Credentials):
     if not creds.username or not creds.password:
         raise HTTPException(status_code=400, detail="username and password required")
     
-    ok = create_user(creds.username, creds.password)
+    try:
+        ok = await create_user(creds.username, creds.password)
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     if not ok:
         raise HTTPException(status_code=400, detail="username already exists")
     
@@ -32,19 +36,19 @@ async def login(creds: Credentials):
     if not creds.username or not creds.password:
         raise HTTPException(status_code=400, detail="username and password required")
     
-    conn = get_db_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT password_hash, salt FROM users WHERE username=?", (creds.username,))
-    r = cur.fetchone()
-    conn.close()
+    r = await get_user_credentials_db(creds.username)
     
     if not r:
         raise HTTPException(status_code=401, detail="invalid credentials")
     
-    if not verify_password(creds.password, r["password_hash"], r["salt"]):
+    try:
+        valid = await password_pool.verify_password(creds.password, r["password_hash"], r["salt"])
+    except PasswordPoolBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if not valid:
         raise HTTPException(status_code=401, detail="invalid credentials")
     
-    token = create_session(creds.username)
+    token = await create_session(creds.username)
     return {"token": token, "username": creds.username}
 
 
@@ -57,7 +61,7 @@ async def validate_token(request: Request):
         raise HTTPException(status_code=401, detail="missing token")
     
     token = auth[7:].strip()
-    username = verify_token(token)
+    username = await verify_token(token)
     
     if not username:
         raise HTTPException(status_code=401, detail="invalid or expired token")
@@ -75,7 +79,7 @@ async def logout(request: Request):
     
     try:
         token = auth[7:].strip()
-        delete_session(token)
+        await delete_session(token)
         return {"message": "logged out"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Logout error: {str(e)}")
@@ -91,15 +95,21 @@ async def reset_stats(request: Request):
     
     try:
         token = auth[7:].strip()
-        username = verify_token(token)
+        username = await verify_token(token)
         
         if not username:
             raise HTTPException(status_code=401, detail="invalid or expired token")
         
-        clear_history_db(username)
+        await clear_history_db(username)
         return {"message": "stats reset (history cleared for user)"}
         
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Reset error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Reset error: {str(e)}")
+
+
+@router.get("/auth/hashing_status")
+async def hashing_status(username: str = Depends(get_current_username)):
+    """Ocupación del pool de PBKDF2: hilos, operaciones en curso y profundidad de cola."""
+    return password_pool.stats()
@@ -1,17 +1,30 @@
 # app/api/routes/history.py
-from fastapi import APIRouter, Request, HTTPException, Depends
-from ...db.repository import get_history_db, clear_history_db, add_history_db
+from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from ...db.async_repository import get_history_page_db, clear_history_db
 from ...api.deps import get_current_username  # dependencia que extrae username desde token
 
 router = APIRouter()
 
 @router.get("/history")
-async def get_history(username: str = Depends(get_current_username)):
+async def get_history(
+    username: str = Depends(get_current_username),
+    cursor: int | None = Query(None, description="id de la última entrada recibida; se devuelven las anteriores"),
+    limit: int = Query(50, ge=1, le=500),
+    type: str | None = Query(None, description="'texto' o 'url'"),
+    verdict: str | None = None,
+    date_from: str | None = Query(None, description="YYYY-MM-DD[ HH:MM:SS]"),
+    date_to: str | None = Query(None, description="YYYY-MM-DD[ HH:MM:SS] (incluido)"),
+):
     """
-    Retorna el historial del usuario autenticado.
+    Retorna el historial del usuario autenticado paginado por cursor,
+    de más reciente a más antiguo: {"items", "next_cursor", "total"}
+    ("total" solo en la primera página, sin cursor).
     """
     try:
-        history = get_history_db(username)
+        history = await get_history_page_db(
+            username, cursor=cursor, limit=limit, type=type, verdict=verdict,
+            date_from=date_from, date_to=date_to
+        )
         return history
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching history: {e}")
@@ -22,7 +35,7 @@ async def delete_history(username: str = Depends(get_current_username)):
     Borra TODO el historial del usuario autenticado.
     """
     try:
-        clear_history_db(username)
+        await clear_history_db(username)
         return {"ok": True, "deleted_for": username}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error clearing history: {e}")
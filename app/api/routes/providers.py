@@ -0,0 +1,31 @@
+# app/api/routes/providers.py
+from fastapi import APIRouter, Depends
+
+from ...api.deps import get_current_username
+from ...core.config import settings
+from ...services.circuit_breaker import gemini_breaker, safe_browsing_breaker
+from ...services.blocklist import blocklist
+from ...services.scoring import url_memo_stats
+
+router = APIRouter()
+
+
+@router.get("/providers/status")
+async def providers_status(username: str = Depends(get_current_username)):
+    """
+    Estado de los proveedores remotos: circuit breaker (closed/open/half_open),
+    tasa de fallos en la ventana y timeout adaptativo actual. Para la heurística
+    local, el uso del memo de score_url; y el estado de la lista de bloqueo.
+    """
+    return {
+        "gemini": {
+            "configured": bool(settings.GEMINI_API_KEY and settings.GEMINI_API_URL),
+            **gemini_breaker.snapshot(settings.GEMINI_TIMEOUT),
+        },
+        "safe_browsing": {
+            "configured": bool(settings.GOOGLE_SAFE_BROWSING_API_KEY),
+            **safe_browsing_breaker.snapshot(settings.SAFE_BROWSING_TIMEOUT),
+        },
+        "heuristic": {"url_memo": url_memo_stats()},
+        "blocklist": blocklist.stats(),
+    }
@@ -1,7 +1,7 @@
 import logging
-from fastapi import APIRouter, HTTPException, Request
-from ...db.repository import get_stats_db_for_user
-from ...core.security import verify_token
+from fastapi import APIRouter, HTTPException, Request, Depends, Query
+from ...db.async_repository import get_stats_db_for_user, get_stats_rollup_db, verify_token
+from ...api.deps import get_current_username
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
@@ -16,15 +16,37 @@ async def get_stats(request: Request):
         raise HTTPException(status_code=401, detail="missing token")
     
     token = auth[7:].strip()
-    username = verify_token(token)
+    username = await verify_token(token)
     
     if not username:
         raise HTTPException(status_code=401, detail="invalid or expired token")
     
     try:
-        stats = get_stats_db_for_user(username)
+        stats = await get_stats_db_for_user(username)
         logger.info(f"Stats recuperadas para {username}: {stats}")
         return stats
     except Exception as e:
         logger.error(f"Error fetching stats for {username}: {e}")
-        raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error fetching stats: {str(e)}")
+
+
+@router.get("/stats/rollup")
+async def get_stats_rollup(
+    username: str = Depends(get_current_username),
+    granularity: str = Query("day", pattern="^(day|hour)$"),
+    date_from: str | None = Query(None, description="YYYY-MM-DD[ HH:00]"),
+    date_to: str | None = Query(None, description="YYYY-MM-DD[ HH:00] (incluido)"),
+    type: str | None = Query(None, description="'texto' o 'url'"),
+):
+    """
+    Tendencias de riesgo por día u hora: total, riesgo medio y reparto
+    seguro/sospechoso/phishing por tipo, leídos de la tabla de agregados.
+    """
+    try:
+        buckets = await get_stats_rollup_db(
+            username, granularity=granularity, date_from=date_from, date_to=date_to, type=type
+        )
+        return {"granularity": granularity, "buckets": buckets}
+    except Exception as e:
+        logger.error(f"Error fetching stats rollup for {username}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error fetching stats rollup: {str(e)}")
@@ -8,6 +8,61 @@ class Settings:
     GEMINI_API_KEY: str | None = os.getenv("GEMINI_API_KEY")
     GEMINI_API_URL: str | None = os.getenv("GEMINI_API_URL")
 
+    # análisis: tiempo máximo total (segundos) para los proveedores remotos
+    ANALYZE_DEADLINE_SECONDS: float = float(os.getenv("ANALYZE_DEADLINE_SECONDS", "10"))
+    # texto: umbrales de la heurística local a partir de los cuales no se consulta Gemini
+    # (TEXT_DECISIVE_LOW=-1 desactiva el corte por abajo)
+    TEXT_DECISIVE_HIGH: int = int(os.getenv("TEXT_DECISIVE_HIGH", "90"))
+    TEXT_DECISIVE_LOW: int = int(os.getenv("TEXT_DECISIVE_LOW", "-1"))
+
+    # clientes HTTP compartidos (pool de conexiones por proveedor)
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_HTTP2: bool = os.getenv("HTTP_HTTP2", "1") == "1"
+    GEMINI_TIMEOUT: float = float(os.getenv("GEMINI_TIMEOUT", "15"))
+    SAFE_BROWSING_TIMEOUT: float = float(os.getenv("SAFE_BROWSING_TIMEOUT", "8"))
+
+    # caché de veredictos del LLM (memoria + tabla llm_cache)
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+    LLM_CACHE_TTL_SECONDS: float = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(24 * 3600)))
+    LLM_CACHE_MEMORY_ITEMS: int = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", "1024"))
+    LLM_CACHE_DB_MAX_ROWS: int = int(os.getenv("LLM_CACHE_DB_MAX_ROWS", "100000"))
+
+    # marcas protegidas frente a suplantación (ver services/brand_index.py);
+    # vacío = grupos por defecto. El fichero añade una marca por línea. Cada
+    # entrada admite sus dominios propios: "marca=propio1|propio2".
+    PROTECTED_BRANDS: str | None = os.getenv("PROTECTED_BRANDS")
+    PROTECTED_BRANDS_FILE: str | None = os.getenv("PROTECTED_BRANDS_FILE")
+
+    # memo LRU de la heurística de URLs (score_url)
+    URL_SCORE_MEMO_MAX: int = int(os.getenv("URL_SCORE_MEMO_MAX", "4096"))
+
+    # micro-batching de llamadas a Gemini (desactivado por defecto)
+    GEMINI_BATCH_ENABLED: bool = os.getenv("GEMINI_BATCH_ENABLED", "0") == "1"
+    GEMINI_BATCH_WINDOW_MS: float = float(os.getenv("GEMINI_BATCH_WINDOW_MS", "20"))
+    GEMINI_BATCH_MAX_ITEMS: int = int(os.getenv("GEMINI_BATCH_MAX_ITEMS", "8"))
+
+    # circuit breaker y timeouts adaptativos por proveedor
+    BREAKER_WINDOW: int = int(os.getenv("BREAKER_WINDOW", "50"))
+    BREAKER_MIN_CALLS: int = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+    BREAKER_FAILURE_THRESHOLD: float = float(os.getenv("BREAKER_FAILURE_THRESHOLD", "0.5"))
+    BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("BREAKER_SLOW_CALL_SECONDS", "6"))
+    BREAKER_OPEN_SECONDS: float = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+    BREAKER_HALF_OPEN_CALLS: int = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "2"))
+    BREAKER_MIN_TIMEOUT: float = float(os.getenv("BREAKER_MIN_TIMEOUT", "1"))
+    BREAKER_TIMEOUT_MULTIPLIER: float = float(os.getenv("BREAKER_TIMEOUT_MULTIPLIER", "2"))
+
+    # análisis por lotes (NDJSON)
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_MAX_LINE_BYTES: int = int(os.getenv("BATCH_MAX_LINE_BYTES", str(256 * 1024)))
+    BATCH_SPOOL_MEMORY_BYTES: int = int(os.getenv("BATCH_SPOOL_MEMORY_BYTES", str(4 * 1024 * 1024)))
+
+    # escritura diferida (write-behind) del historial
+    HISTORY_QUEUE_MAX: int = int(os.getenv("HISTORY_QUEUE_MAX", "10000"))
+    HISTORY_BATCH_ROWS: int = int(os.getenv("HISTORY_BATCH_ROWS", "500"))
+    HISTORY_FLUSH_MS: float = float(os.getenv("HISTORY_FLUSH_MS", "50"))
+
     # rutas
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     PROJECT_ROOT = os.path.dirname(BASE_DIR)
@@ -15,4 +70,36 @@ class Settings:
     DB_FILE = os.path.join(DATA_DIR, "app.db")
     LEGACY_HISTORY_JSON = os.path.join(DATA_DIR, "history.json")
 
+    # lista de bloqueo local (ver services/blocklist.py); si hay directorio de
+    # feeds, se recompila cuando alguno cambia
+    BLOCKLIST_FILE: str = os.getenv("BLOCKLIST_FILE", os.path.join(DATA_DIR, "blocklist.bin"))
+    BLOCKLIST_FEEDS_DIR: str | None = os.getenv("BLOCKLIST_FEEDS_DIR")
+    BLOCKLIST_FP_RATE: float = float(os.getenv("BLOCKLIST_FP_RATE", "0.001"))
+    BLOCKLIST_REFRESH_SECONDS: float = float(os.getenv("BLOCKLIST_REFRESH_SECONDS", "60"))
+
+    # SQLite: conexiones persistentes por hilo y PRAGMAs
+    DB_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+    DB_CACHE_SIZE_KB: int = int(os.getenv("DB_CACHE_SIZE_KB", str(64 * 1024)))
+    DB_MMAP_SIZE: int = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+    DB_CACHED_STATEMENTS: int = int(os.getenv("DB_CACHED_STATEMENTS", "256"))
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "4"))
+
+    # sesiones: "db" (tabla sessions) o "signed" (tokens HMAC sin estado)
+    SESSION_TOKEN_MODE: str = os.getenv("SESSION_TOKEN_MODE", "db")
+    # "kid:secreto,kid_antiguo:secreto_antiguo" — se firma con la primera
+    SESSION_SIGNING_KEYS: str | None = os.getenv("SESSION_SIGNING_KEYS")
+    SESSION_REVOCATION_REFRESH_SECONDS: float = float(os.getenv("SESSION_REVOCATION_REFRESH_SECONDS", "30"))
+
+    # limpieza periódica de sesiones caducadas
+    SESSION_REAPER_INTERVAL_SECONDS: float = float(os.getenv("SESSION_REAPER_INTERVAL_SECONDS", "3600"))
+    SESSION_REAPER_BATCH: int = int(os.getenv("SESSION_REAPER_BATCH", "500"))
+
+    # caché en memoria de tokens de sesión
+    SESSION_CACHE_TTL_SECONDS: float = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "60"))
+    SESSION_CACHE_MAX: int = int(os.getenv("SESSION_CACHE_MAX", "10000"))
+
+    # pool de hilos para PBKDF2 (login/signup)
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+    PASSWORD_HASH_MAX_QUEUE: int = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
 settings = Settings()
@@ -0,0 +1,82 @@
+# app/core/password_pool.py
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import settings
+from .security import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class PasswordPoolBusy(Exception):
+    """Demasiadas operaciones de hash en cola: se rechaza en lugar de acumular."""
+
+
+class PasswordHashPool:
+    """
+    Ejecuta PBKDF2 (hash_password / verify_password) en un pool de hilos
+    propio con `workers` hilos como máximo; hashlib libera el GIL durante el
+    cálculo, así que el event loop sigue atendiendo el resto de peticiones.
+
+    Si ya hay `max_queue` operaciones esperando, `run` lanza PasswordPoolBusy.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pbkdf2")
+        self._lock = threading.Lock()
+        self._pending = 0   # enviadas y sin terminar (en cola + ejecutándose)
+        self._running = 0
+        self.counters = {"completed": 0, "rejected": 0}
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._pending - self._running >= self.max_queue:
+                self.counters["rejected"] += 1
+                raise PasswordPoolBusy("Demasiadas operaciones de autenticación en curso")
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._executor, functools.partial(self._call, fn, *args))
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self.counters["completed"] += 1
+
+    def _call(self, fn, *args):
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    async def hash_password(self, password: str) -> tuple[str, str]:
+        return await self.run(hash_password, password)
+
+    async def verify_password(self, password: str, pw_hash_hex: str, salt_hex: str) -> bool:
+        return await self.run(verify_password, password, pw_hash_hex, salt_hex)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "max_queue": self.max_queue,
+                **self.counters,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordHashPool(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -1,7 +1,14 @@
 import secrets
 import hashlib
 import datetime
+import threading
+import time
+from collections import OrderedDict
 from ..db.database import get_db_conn
+from .config import settings
+from .signed_tokens import (
+    is_signed_token, create_signed_token, verify_signed_token, revoke_signed_token
+)
 
 # Igual que en tu monolito: PBKDF2-HMAC-SHA256 con 150k iteraciones. :contentReference[oaicite:4]{index=4}
 def hash_password(password: str, salt: bytes | None = None) -> tuple[str, str]:
@@ -16,8 +23,12 @@ def verify_password(password: str, pw_hash_hex: str, salt_hex: str) -> bool:
     return secrets.compare_digest(calc, pw_hash_hex)
 
 def create_user(username: str, password: str) -> bool:
-    conn = get_db_conn(); cur = conn.cursor()
     pw_hash, salt = hash_password(password)
+    return insert_user(username, pw_hash, salt)
+
+def insert_user(username: str, pw_hash: str, salt: str) -> bool:
+    """Inserta un usuario con la contraseña ya hasheada. False si ya existe."""
+    conn = get_db_conn(); cur = conn.cursor()
     try:
         cur.execute(
             "INSERT INTO users (username,password_hash,salt,created_at) VALUES (?,?,?,?)",
@@ -30,26 +41,55 @@ def create_user(username: str, password: str) -> bool:
     finally:
         conn.close()
 
-def create_session(username: str) -> str:
-    token = secrets.token_urlsafe(32)
-    expires = (datetime.datetime.utcnow() + datetime.timedelta(hours=24)).isoformat()
-    conn = get_db_conn(); cur = conn.cursor()
-    cur.execute("INSERT INTO sessions (token,username,expires_at) VALUES (?,?,?)",
-                (token, username, expires))
-    conn.commit(); conn.close()
-    return token
+# Caché en memoria de sesiones válidas: token -> (username, expires_epoch, cacheada_hasta).
+# Evita la consulta a 'sessions' en cada petición autenticada durante
+# SESSION_CACHE_TTL_SECONDS; delete_session la invalida al momento.
+_session_cache: "OrderedDict[str, tuple[str, int, float]]" = OrderedDict()
+_session_cache_lock = threading.Lock()
+
+def cached_token_user(token: str) -> str | None:
+    """Username de la caché si el token está cacheado y sigue vigente; None si hay que ir a la BD."""
+    with _session_cache_lock:
+        item = _session_cache.get(token)
+        if item is None:
+            return None
+        username, expires_at, cached_until = item
+        if cached_until < time.monotonic() or expires_at < time.time():
+            del _session_cache[token]
+            return None
+        _session_cache.move_to_end(token)
+        return username
+
+def _cache_session(token: str, username: str, expires_at: int) -> None:
+    with _session_cache_lock:
+        _session_cache[token] = (username, expires_at, time.monotonic() + settings.SESSION_CACHE_TTL_SECONDS)
+        _session_cache.move_to_end(token)
+        while len(_session_cache) > settings.SESSION_CACHE_MAX:
+            _session_cache.popitem(last=False)
+
+def invalidate_cached_session(token: str) -> None:
+    with _session_cache_lock:
+        _session_cache.pop(token, None)
 
 def verify_token(token: str) -> str | None:
+    if is_signed_token(token):
+        return verify_signed_token(token)
+    username = cached_token_user(token)
+    if username:
+        return username
     conn = get_db_conn(); cur = conn.cursor()
-    cur.execute("SELECT username,expires_at FROM sessions WHERE token=?", (token,))
+    cur.execute("SELECT username,expires_epoch FROM sessions WHERE token=?", (token,))
     r = cur.fetchone(); conn.close()
-    if not r:
-        return None
-    if datetime.datetime.fromisoformat(r["expires_at"]) < datetime.datetime.utcnow():
+    if not r or r["expires_epoch"] is None or r["expires_epoch"] < time.time():
         return None
+    _cache_session(token, r["username"], r["expires_epoch"])
     return r["username"]
 
 def delete_session(token: str) -> None:
+    if is_signed_token(token):
+        revoke_signed_token(token)
+        return
+    invalidate_cached_session(token)
     conn = get_db_conn(); cur = conn.cursor()
     cur.execute("DELETE FROM sessions WHERE token=?", (token,))
     conn.commit(); conn.close()
@@ -58,11 +98,33 @@ def delete_session(token: str) -> None:
 SESSION_TTL_HOURS = 24 * 30   # 30 días
 
 def create_session(username: str) -> str:
+    if settings.SESSION_TOKEN_MODE == "signed":
+        return create_signed_token(username, SESSION_TTL_HOURS * 3600)
     token = secrets.token_urlsafe(32)
-    expires = (datetime.datetime.utcnow() +
-               datetime.timedelta(hours=SESSION_TTL_HOURS)).isoformat()
+    expires = datetime.datetime.utcnow() + datetime.timedelta(hours=SESSION_TTL_HOURS)
+    expires_epoch = int(expires.replace(tzinfo=datetime.timezone.utc).timestamp())
     conn = get_db_conn(); cur = conn.cursor()
-    cur.execute("INSERT OR REPLACE INTO sessions(token,username,expires_at) VALUES(?,?,?)",
-                (token, username, expires))
+    cur.execute("INSERT OR REPLACE INTO sessions(token,username,expires_at,expires_epoch) VALUES(?,?,?,?)",
+                (token, username, expires.isoformat(), expires_epoch))
     conn.commit(); conn.close()
-    return token
\ No newline at end of file
+    return token
+
+def purge_expired_sessions(batch_size: int = 500) -> int:
+    """Borra las sesiones caducadas en lotes (transacciones cortas); devuelve cuántas."""
+    now = int(time.time())
+    removed = 0
+    conn = get_db_conn(); cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(
+                "DELETE FROM sessions WHERE rowid IN "
+                "(SELECT rowid FROM sessions WHERE expires_epoch<? LIMIT ?)",
+                (now, batch_size),
+            )
+            conn.commit()
+            removed += cur.rowcount
+            if cur.rowcount < batch_size:
+                break
+    finally:
+        conn.close()
+    return removed
\ No newline at end of file
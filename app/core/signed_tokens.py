@@ -0,0 +1,140 @@
+# app/core/signed_tokens.py
+"""
+Tokens de sesión firmados (sin estado): "v1.<kid>.<payload>.<firma>".
+
+El payload (base64url de JSON) lleva usuario, expiración y un id único (jti);
+la firma es HMAC-SHA256 con la clave `kid`. Validarlos no requiere I/O, así
+que funcionan igual en todos los workers.
+
+- Rotación: SESSION_SIGNING_KEYS="kid2:secreto2,kid1:secreto1". Se firma con
+  la primera y se aceptan todas, así que una clave se retira quitándola de la
+  lista cuando ya no quedan tokens vivos firmados con ella.
+- Logout: el jti se añade a 'revoked_tokens' (con su expiración, para poder
+  purgarla) y a un conjunto en memoria que cada worker recarga periódicamente.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import threading
+import time
+
+from ..db.database import get_db_conn
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PREFIX = "v1."
+
+
+def _load_keys() -> list[tuple[str, bytes]]:
+    keys = []
+    for item in (settings.SESSION_SIGNING_KEYS or "").split(","):
+        kid, sep, secret = item.strip().partition(":")
+        if sep and kid and secret:
+            keys.append((kid, secret.encode("utf-8")))
+    if not keys and settings.SESSION_TOKEN_MODE == "signed":
+        logger.warning(
+            "SESSION_SIGNING_KEYS vacío: se usa una clave aleatoria; los tokens no "
+            "sobrevivirán a un reinicio ni valdrán entre workers"
+        )
+        keys.append(("ephemeral", secrets.token_bytes(32)))
+    return keys
+
+
+_keys = _load_keys()
+_keys_by_id = dict(_keys)
+
+# jti revocado -> expiración (epoch). Solo hace falta recordarlo hasta que caduca.
+_revoked: dict[str, int] = {}
+_revoked_lock = threading.Lock()
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(key: bytes, message: str) -> str:
+    return _b64(hmac.new(key, message.encode("ascii"), hashlib.sha256).digest())
+
+
+def is_signed_token(token: str) -> bool:
+    return token.startswith(TOKEN_PREFIX)
+
+
+def create_signed_token(username: str, ttl_seconds: int) -> str:
+    kid, key = _keys[0]
+    payload = _b64(json.dumps(
+        {"u": username, "exp": int(time.time()) + ttl_seconds, "jti": secrets.token_urlsafe(12)},
+        separators=(",", ":")
+    ).encode("utf-8"))
+    message = f"{TOKEN_PREFIX}{kid}.{payload}"
+    return f"{message}.{_sign(key, message)}"
+
+
+def _decode(token: str) -> dict | None:
+    """Payload del token si la firma es válida y no ha caducado (sin mirar revocaciones)."""
+    try:
+        _, kid, payload, sig = token.split(".")
+    except ValueError:
+        return None
+    key = _keys_by_id.get(kid)
+    if key is None:
+        return None
+    try:
+        if not hmac.compare_digest(sig, _sign(key, f"{TOKEN_PREFIX}{kid}.{payload}")):
+            return None
+        data = json.loads(_unb64(payload))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(data, dict) or data.get("exp", 0) < time.time():
+        return None
+    return data
+
+
+def verify_signed_token(token: str) -> str | None:
+    data = _decode(token)
+    if data is None:
+        return None
+    with _revoked_lock:
+        if data.get("jti") in _revoked:
+            return None
+    return data.get("u")
+
+
+def revoke_signed_token(token: str) -> None:
+    data = _decode(token)
+    if data is None:
+        return
+    # Primero a la BD: una recarga concurrente ya verá la fila al hacer su SELECT
+    conn = get_db_conn(); cur = conn.cursor()
+    cur.execute("INSERT OR REPLACE INTO revoked_tokens (jti,expires_at) VALUES (?,?)",
+                (data["jti"], data["exp"]))
+    conn.commit(); conn.close()
+    with _revoked_lock:
+        _revoked[data["jti"]] = data["exp"]
+
+
+def refresh_revocations() -> int:
+    """
+    Trae de la BD los jti revocados (también los de otros workers) y los añade
+    al conjunto en memoria; purga los caducados en ambos sitios. Se fusiona en
+    lugar de reemplazar para no perder un logout registrado durante la recarga.
+    """
+    now = int(time.time())
+    conn = get_db_conn(); cur = conn.cursor()
+    cur.execute("DELETE FROM revoked_tokens WHERE expires_at<?", (now,))
+    cur.execute("SELECT jti, expires_at FROM revoked_tokens")
+    rows = {r["jti"]: r["expires_at"] for r in cur.fetchall()}
+    conn.commit(); conn.close()
+    with _revoked_lock:
+        _revoked.update(rows)
+        for jti in [j for j, exp in _revoked.items() if exp < now]:
+            del _revoked[jti]
+        return len(_revoked)
@@ -0,0 +1,71 @@
+# app/db/async_repository.py
+"""
+Versión async de las funciones de repositorio y de sesión: misma interfaz,
+pero cada llamada se ejecuta en el executor de BD para no bloquear el event loop.
+"""
+from . import repository
+from ..core import security
+from .executor import run_db
+from .history_writer import history_writer
+from ..core.password_pool import password_pool
+from ..core.config import settings
+from ..core.signed_tokens import is_signed_token, verify_signed_token, refresh_revocations
+
+
+async def add_history_db(entry: dict):
+    return await run_db(repository.add_history_db, entry)
+
+async def add_history_bulk_db(entries: list[dict]):
+    return await run_db(repository.add_history_bulk_db, entries)
+
+async def get_history_db(username: str | None = None):
+    await history_writer.flush()  # leer también lo que sigue en la cola
+    return await run_db(repository.get_history_db, username)
+
+async def get_history_page_db(username: str, **filters):
+    await history_writer.flush()  # leer también lo que sigue en la cola
+    return await run_db(repository.get_history_page_db, username, **filters)
+
+async def clear_history_db(username: str | None = None):
+    # Lo que aún está en la cola write-behind se escribiría después del borrado
+    await history_writer.flush()
+    return await run_db(repository.clear_history_db, username)
+
+async def get_stats_db_for_user(username: str):
+    await history_writer.flush()  # leer también lo que sigue en la cola
+    return await run_db(repository.get_stats_db_for_user, username)
+
+async def get_stats_rollup_db(username: str, **filters):
+    await history_writer.flush()  # leer también lo que sigue en la cola
+    return await run_db(repository.get_stats_rollup_db, username, **filters)
+
+async def get_user_credentials_db(username: str):
+    return await run_db(repository.get_user_credentials_db, username)
+
+async def create_user(username: str, password: str) -> bool:
+    # PBKDF2 en su propio pool; solo el INSERT pasa por el executor de BD
+    pw_hash, salt = await password_pool.hash_password(password)
+    return await run_db(security.insert_user, username, pw_hash, salt)
+
+async def create_session(username: str) -> str:
+    if settings.SESSION_TOKEN_MODE == "signed":
+        return security.create_session(username)  # sin I/O
+    return await run_db(security.create_session, username)
+
+async def verify_token(token: str) -> str | None:
+    if is_signed_token(token):
+        return verify_signed_token(token)  # sin I/O
+    # Con la sesión en caché no hace falta ni pasar por el executor
+    username = security.cached_token_user(token)
+    if username:
+        return username
+    return await run_db(security.verify_token, token)
+
+async def delete_session(token: str) -> None:
+    return await run_db(security.delete_session, token)
+
+async def refresh_token_revocations() -> int:
+    return await run_db(refresh_revocations)
+
+async def purge_expired_sessions(batch_size: int) -> int:
+    return await run_db(security.purge_expired_sessions, batch_size)
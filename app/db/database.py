@@ -1,4 +1,4 @@
-import os, json, sqlite3, logging
+import os, json, sqlite3, logging, threading
 from ..core.config import settings
 
 logging.basicConfig(level=logging.INFO)
@@ -7,36 +7,72 @@ def ensure_data_dir():
     if not os.path.exists(settings.DATA_DIR):
         os.makedirs(settings.DATA_DIR, exist_ok=True)
 
-def get_db_conn():
+# Una conexión persistente por hilo: se abre (y se configura) la primera vez
+# y se reutiliza, en lugar de pagar connect + stat en cada consulta.
+_local = threading.local()
+
+
+class PooledConnection:
+    """
+    Envuelve la conexión del hilo. `close()` no cierra: devuelve la conexión
+    al pool (deshaciendo cualquier transacción que haya quedado abierta), así
+    que el código existente `conn = get_db_conn(); ...; conn.close()` sigue
+    funcionando igual. Como la conexión es compartida dentro del hilo, no se
+    deben anidar dos get_db_conn() en la misma función.
+    """
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self._raw.__enter__()
+
+    def __exit__(self, *exc):
+        return self._raw.__exit__(*exc)
+
+    def close(self):
+        if self._raw.in_transaction:
+            self._raw.rollback()
+
+
+def _open_connection() -> sqlite3.Connection:
     ensure_data_dir()
-    conn = sqlite3.connect(settings.DB_FILE, check_same_thread=False)
+    conn = sqlite3.connect(
+        settings.DB_FILE,
+        check_same_thread=False,
+        cached_statements=settings.DB_CACHED_STATEMENTS,
+    )
     conn.row_factory = sqlite3.Row
+    # WAL: las lecturas no se bloquean con las escrituras
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={int(settings.DB_BUSY_TIMEOUT_MS)}")
+    conn.execute(f"PRAGMA cache_size={-int(settings.DB_CACHE_SIZE_KB)}")
+    conn.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+    conn.execute("PRAGMA temp_store=MEMORY")
     return conn
 
-def init_db():
-    conn = get_db_conn(); cur = conn.cursor()
-    cur.execute("""CREATE TABLE IF NOT EXISTS history (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT,
-        type TEXT,
-        input TEXT,
-        verdict TEXT,
-        percentage INTEGER,
-        timestamp TEXT
-    )""")
-    cur.execute("""CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE,
-        password_hash TEXT,
-        salt TEXT,
-        created_at TEXT
-    )""")
-    cur.execute("""CREATE TABLE IF NOT EXISTS sessions (
-        token TEXT PRIMARY KEY,
-        username TEXT,
-        expires_at TEXT
-    )""")
-    conn.commit(); conn.close()
+
+def get_db_conn():
+    pooled = getattr(_local, "conn", None)
+    if pooled is None:
+        pooled = PooledConnection(_open_connection())
+        _local.conn = pooled
+    elif pooled.in_transaction:
+        # Transacción abandonada por un error antes de close()
+        pooled.rollback()
+    return pooled
+
+
+def close_thread_connection():
+    """Cierra de verdad la conexión del hilo actual (p.ej. en el shutdown)."""
+    pooled = getattr(_local, "conn", None)
+    if pooled is not None:
+        pooled._raw.close()
+        _local.conn = None
 
 def migrate_json_history():
     # Igual que tu monolito: leer legacy history.json si existe y volcar a SQLite. :contentReference[oaicite:5]{index=5}
@@ -58,17 +94,3 @@ def migrate_json_history():
                 json.dump([], f)
         except Exception:
             pass
-
-def ensure_db_schema():
-    # Añade columna username en history si faltase (migración idempotente). :contentReference[oaicite:6]{index=6}
-    conn = get_db_conn(); cur = conn.cursor()
-    try:
-        cur.execute("PRAGMA table_info(history)")
-        cols = [r[1] for r in cur.fetchall()]
-        if "username" not in cols:
-            cur.execute("ALTER TABLE history ADD COLUMN username TEXT")
-            conn.commit()
-    except Exception:
-        logging.exception("Failed to ensure DB schema")
-    finally:
-        conn.close()
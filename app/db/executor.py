@@ -0,0 +1,21 @@
+# app/db/executor.py
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+from ..core.config import settings
+
+# Hilos dedicados a SQLite: el event loop nunca ejecuta consultas. Cada hilo
+# reutiliza su propia conexión (ver database.get_db_conn) y, con WAL, las
+# lecturas de varios hilos no se bloquean con las escrituras.
+_executor = ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(fn, *args, **kwargs):
+    """Ejecuta una función bloqueante de base de datos en el executor de BD."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(fn, *args, **kwargs))
+
+
+def shutdown_db_executor() -> None:
+    _executor.shutdown(wait=True)
@@ -0,0 +1,138 @@
+# app/db/history_writer.py
+import asyncio
+import logging
+
+from ..core.config import settings
+from .repository import add_history_db, add_history_bulk_db
+from .executor import run_db
+
+logger = logging.getLogger(__name__)
+
+
+_FLUSH = object()  # marca en la cola: escribir ya el lote en curso
+
+
+class HistoryWriter:
+    """
+    Cola write-behind para el historial: los handlers encolan la entrada y
+    vuelven; una tarea de fondo agrupa las entradas y las inserta en una sola
+    transacción (cada `flush_ms` o al juntar `batch_rows` filas) en el executor de BD,
+    para que el commit a disco no bloquee el event loop.
+
+    `enqueue` devuelve un future que se resuelve (True/False) cuando la fila
+    está confirmada en la BD, sin esperarlo. Las lecturas de historial y
+    estadísticas llaman a `flush`, que corta la ventana y espera a que se
+    confirme todo lo encolado hasta ese momento (read-your-writes).
+
+    Si la cola está llena, `enqueue` espera (backpressure).
+    """
+
+    def __init__(self, max_queue: int, batch_rows: int, flush_ms: float):
+        self.max_queue = max_queue
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_ms / 1000.0
+        self._queue: asyncio.Queue | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._last: asyncio.Future | None = None
+        self.counters = {"enqueued": 0, "written": 0, "batches": 0, "errors": 0}
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Vacía la cola y detiene la tarea de fondo."""
+        if not self.running:
+            return
+        await self._put(None)
+        await self._task
+        self._task = None
+
+    async def _put(self, item) -> None:
+        await self._queue.put(item)
+        self._wakeup.set()
+
+    async def enqueue(self, entry: dict) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        if not self.running:
+            # Sin tarea de fondo (scripts, arranque): escritura directa
+            await run_db(add_history_db, entry)
+            fut.set_result(True)
+            return fut
+        await self._put((entry, fut))
+        self._last = fut
+        self.counters["enqueued"] += 1
+        return fut
+
+    async def flush(self) -> None:
+        """Escribe ya lo encolado y espera su commit (se escribe en orden FIFO)."""
+        last = self._last
+        if last is None or last.done() or not self.running:
+            return
+        await self._put(_FLUSH)
+        await asyncio.shield(last)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self._queue.get()
+            if first is None:
+                break
+            if first is _FLUSH:
+                continue
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_rows:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    # Esperar a la siguiente entrada, a un flush o al final de la ventana
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                if item is None:
+                    stopping = True
+                    break
+                if item is _FLUSH:
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            await run_db(add_history_bulk_db, [entry for entry, _ in batch])
+            self.counters["written"] += len(batch)
+            self.counters["batches"] += 1
+            ok = True
+        except Exception:
+            self.counters["errors"] += 1
+            logger.exception(f"Error escribiendo {len(batch)} entradas de historial")
+            ok = False
+        for _, fut in batch:
+            if not fut.done():
+                fut.set_result(ok)
+
+    def stats(self) -> dict:
+        return {**self.counters, "queued": self._queue.qsize() if self._queue else 0}
+
+
+history_writer = HistoryWriter(
+    max_queue=settings.HISTORY_QUEUE_MAX,
+    batch_rows=settings.HISTORY_BATCH_ROWS,
+    flush_ms=settings.HISTORY_FLUSH_MS,
+)
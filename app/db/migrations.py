@@ -0,0 +1,171 @@
+# app/db/migrations.py
+"""
+Migraciones versionadas del esquema SQLite.
+
+Cada migración es (versión, nombre, función(cursor)) y se aplica una sola vez,
+dentro de su propia transacción, registrándose en la tabla 'schema_migrations'.
+Todas son idempotentes (IF NOT EXISTS / comprobación previa), de modo que
+también se pueden aplicar sobre bases de datos creadas antes de este sistema.
+Para cambiar el esquema se añade una migración nueva al final de MIGRATIONS;
+nunca se edita una ya publicada.
+"""
+import datetime
+import logging
+
+from .database import get_db_conn
+from .repository import rebuild_user_stats, rebuild_stats_rollup
+
+logger = logging.getLogger(__name__)
+
+
+def _m001_base_tables(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT,
+        type TEXT,
+        input TEXT,
+        verdict TEXT,
+        percentage INTEGER,
+        timestamp TEXT
+    )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE,
+        password_hash TEXT,
+        salt TEXT,
+        created_at TEXT
+    )""")
+    cur.execute("""CREATE TABLE IF NOT EXISTS sessions (
+        token TEXT PRIMARY KEY,
+        username TEXT,
+        expires_at TEXT
+    )""")
+
+
+def _m002_history_username(cur):
+    # BDs antiguas sin columna username en history
+    cur.execute("PRAGMA table_info(history)")
+    cols = [r[1] for r in cur.fetchall()]
+    if "username" not in cols:
+        cur.execute("ALTER TABLE history ADD COLUMN username TEXT")
+
+
+def _m003_llm_cache(cur):
+    cur.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+        key TEXT PRIMARY KEY,
+        kind TEXT,
+        value TEXT,
+        created_at REAL,
+        expires_at REAL
+    )""")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_expires ON llm_cache(expires_at)")
+
+
+def _m004_indexes(cur):
+    # Consultas por usuario (historial paginado, stats, borrado) y caducidad de sesiones
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_history_username_id ON history(username, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_history_username_type_verdict ON history(username, type, verdict)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions(expires_at)")
+
+
+def _m005_user_stats(cur):
+    # Agregados por usuario mantenidos al insertar en history (ver repository._insert_history)
+    cur.execute("""CREATE TABLE IF NOT EXISTS user_stats (
+        username TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        risk_sum INTEGER NOT NULL DEFAULT 0,
+        safe_count INTEGER NOT NULL DEFAULT 0,
+        suspicious_count INTEGER NOT NULL DEFAULT 0,
+        phishing_count INTEGER NOT NULL DEFAULT 0
+    )""")
+    rebuild_user_stats(cur)
+
+
+def _m006_stats_rollup(cur):
+    # Agregados por usuario, franja (día/hora) y tipo para los dashboards
+    cur.execute("""CREATE TABLE IF NOT EXISTS stats_rollup (
+        username TEXT NOT NULL,
+        granularity TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        type TEXT,
+        total INTEGER NOT NULL DEFAULT 0,
+        risk_sum INTEGER NOT NULL DEFAULT 0,
+        safe_count INTEGER NOT NULL DEFAULT 0,
+        suspicious_count INTEGER NOT NULL DEFAULT 0,
+        phishing_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (username, granularity, bucket, type)
+    )""")
+    rebuild_stats_rollup(cur)
+
+
+def _m007_revoked_tokens(cur):
+    # jti de tokens firmados revocados (logout) hasta su expiración (epoch)
+    cur.execute("""CREATE TABLE IF NOT EXISTS revoked_tokens (
+        jti TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL
+    )""")
+
+
+def _m008_sessions_epoch(cur):
+    # Caducidad como epoch entero (comparación numérica e indexable); expires_at
+    # (ISO) se mantiene por compatibilidad. Se aprovecha para purgar las caducadas.
+    cur.execute("PRAGMA table_info(sessions)")
+    if "expires_epoch" not in {r[1] for r in cur.fetchall()}:
+        cur.execute("ALTER TABLE sessions ADD COLUMN expires_epoch INTEGER")
+    cur.execute("UPDATE sessions SET expires_epoch=CAST(strftime('%s', expires_at) AS INTEGER) "
+                "WHERE expires_epoch IS NULL")
+    cur.execute("DELETE FROM sessions WHERE expires_epoch IS NULL OR expires_epoch<CAST(strftime('%s','now') AS INTEGER)")
+    cur.execute("DROP INDEX IF EXISTS idx_sessions_expires_at")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires_epoch ON sessions(expires_epoch)")
+
+
+MIGRATIONS = [
+    (1, "tablas base", _m001_base_tables),
+    (2, "columna username en history", _m002_history_username),
+    (3, "caché de veredictos del LLM", _m003_llm_cache),
+    (4, "índices de history y sessions", _m004_indexes),
+    (5, "agregados por usuario (user_stats)", _m005_user_stats),
+    (6, "agregados por franja de tiempo (stats_rollup)", _m006_stats_rollup),
+    (7, "revocaciones de tokens firmados", _m007_revoked_tokens),
+    (8, "caducidad de sesiones como epoch", _m008_sessions_epoch),
+]
+
+
+def get_schema_version(cur) -> int:
+    cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+    return cur.fetchone()[0]
+
+
+def run_migrations() -> int:
+    """Aplica las migraciones pendientes y devuelve la versión final del esquema."""
+    conn = get_db_conn(); cur = conn.cursor()
+    try:
+        cur.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT,
+            applied_at TEXT
+        )""")
+        conn.commit()
+
+        for version, name, migrate in MIGRATIONS:
+            # BEGIN IMMEDIATE: si arrancan varios workers a la vez, solo uno migra
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                if get_schema_version(cur) >= version:
+                    conn.rollback()
+                    continue
+                migrate(cur)
+                cur.execute(
+                    "INSERT INTO schema_migrations (version,name,applied_at) VALUES (?,?,?)",
+                    (version, name, datetime.datetime.now().isoformat()),
+                )
+                conn.commit()
+                logger.info(f"Migración {version} aplicada: {name}")
+            except Exception:
+                conn.rollback()
+                logger.exception(f"Error aplicando la migración {version} ({name})")
+                raise
+
+        return get_schema_version(cur)
+    finally:
+        conn.close()
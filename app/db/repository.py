@@ -1,14 +1,147 @@
 # app/db/repository.py
 from .database import get_db_conn
 
+# Riesgo normalizado (0-100) de una entrada: el porcentaje si lo tiene (texto);
+# si no (URL), un valor estimado a partir del veredicto. Misma regla en SQL para
+# reconstruir los agregados desde 'history'.
+NORMALIZED_RISK_SQL = (
+    "CASE WHEN percentage IS NOT NULL THEN percentage "
+    "WHEN verdict='Segura' THEN 10 WHEN verdict='Maliciosa' THEN 90 ELSE 50 END"
+)
+
+def normalized_risk(percentage, verdict) -> int:
+    if percentage is not None:
+        return percentage
+    if verdict == "Segura":
+        return 10  # Bajo riesgo
+    if verdict == "Maliciosa":
+        return 90  # Alto riesgo
+    return 50  # Sospechosa/Desconocido
+
+def risk_bucket(risk) -> str:
+    """'safe' (<=33), 'suspicious' (<=66) o 'phishing'."""
+    if risk <= 33:
+        return "safe"
+    if risk <= 66:
+        return "suspicious"
+    return "phishing"
+
+# Granularidades de stats_rollup -> cómo se obtiene el bucket a partir del
+# timestamp 'YYYY-MM-DD HH:MM:SS' (como texto ordena cronológicamente)
+ROLLUP_GRANULARITIES = {
+    "day": (lambda ts: ts[:10], "substr(timestamp,1,10)"),
+    "hour": (lambda ts: ts[:13] + ":00", "substr(timestamp,1,13) || ':00'"),
+}
+
+def _insert_history(cur, entries: list[dict]):
+    """
+    Inserta las entradas y actualiza los agregados por usuario (user_stats)
+    y por franja de tiempo (stats_rollup) en la misma transacción del llamante.
+    """
+    cur.executemany(
+        "INSERT INTO history (username,type,input,verdict,percentage,timestamp) VALUES (?,?,?,?,?,?)",
+        [(e.get("username"), e.get("type"), e.get("input"),
+          e.get("verdict"), e.get("percentage"), e.get("timestamp")) for e in entries]
+    )
+
+    deltas: dict[str, list[int]] = {}
+    for e in entries:
+        if not e.get("username"):
+            continue
+        risk = normalized_risk(e.get("percentage"), e.get("verdict"))
+        d = deltas.setdefault(e["username"], [0, 0, 0, 0, 0])
+        d[0] += 1
+        d[1] += risk
+        d[2 + ("safe", "suspicious", "phishing").index(risk_bucket(risk))] += 1
+    cur.executemany(
+        """INSERT INTO user_stats (username,total,risk_sum,safe_count,suspicious_count,phishing_count)
+           VALUES (?,?,?,?,?,?)
+           ON CONFLICT(username) DO UPDATE SET
+               total=total+excluded.total,
+               risk_sum=risk_sum+excluded.risk_sum,
+               safe_count=safe_count+excluded.safe_count,
+               suspicious_count=suspicious_count+excluded.suspicious_count,
+               phishing_count=phishing_count+excluded.phishing_count""",
+        [(u, *d) for u, d in deltas.items()]
+    )
+
+    rollups: dict[tuple, list[int]] = {}
+    for e in entries:
+        ts = e.get("timestamp") or ""
+        if not e.get("username") or len(ts) < 13:
+            continue
+        risk = normalized_risk(e.get("percentage"), e.get("verdict"))
+        for granularity, (bucket_of, _) in ROLLUP_GRANULARITIES.items():
+            d = rollups.setdefault((e["username"], granularity, bucket_of(ts), e.get("type")), [0, 0, 0, 0, 0])
+            d[0] += 1
+            d[1] += risk
+            d[2 + ("safe", "suspicious", "phishing").index(risk_bucket(risk))] += 1
+    cur.executemany(
+        """INSERT INTO stats_rollup
+               (username,granularity,bucket,type,total,risk_sum,safe_count,suspicious_count,phishing_count)
+           VALUES (?,?,?,?,?,?,?,?,?)
+           ON CONFLICT(username,granularity,bucket,type) DO UPDATE SET
+               total=total+excluded.total,
+               risk_sum=risk_sum+excluded.risk_sum,
+               safe_count=safe_count+excluded.safe_count,
+               suspicious_count=suspicious_count+excluded.suspicious_count,
+               phishing_count=phishing_count+excluded.phishing_count""",
+        [(*k, *d) for k, d in rollups.items()]
+    )
+
 def add_history_db(entry: dict):
     conn = get_db_conn()
     cur = conn.cursor()
+    _insert_history(cur, [entry])
+    conn.commit()
+    conn.close()
+
+def add_history_bulk_db(entries: list[dict]):
+    """Inserta varias entradas de historial en una sola transacción."""
+    if not entries:
+        return
+    conn = get_db_conn()
+    cur = conn.cursor()
+    _insert_history(cur, entries)
+    conn.commit()
+    conn.close()
+
+def rebuild_user_stats(cur, username: str | None = None):
+    """Recalcula user_stats desde 'history' (de un usuario o de todos) dentro de la transacción de `cur`."""
+    where = "WHERE username=?" if username else "WHERE username IS NOT NULL"
+    params = (username,) if username else ()
+    cur.execute(f"DELETE FROM user_stats {where}", params)
     cur.execute(
-        "INSERT INTO history (username,type,input,verdict,percentage,timestamp) VALUES (?,?,?,?,?,?)",
-        (entry.get("username"), entry.get("type"), entry.get("input"),
-         entry.get("verdict"), entry.get("percentage"), entry.get("timestamp"))
+        f"""INSERT INTO user_stats (username,total,risk_sum,safe_count,suspicious_count,phishing_count)
+            SELECT username, COUNT(*), SUM(r),
+                   SUM(r<=33), SUM(r>33 AND r<=66), SUM(r>66)
+            FROM (SELECT username, {NORMALIZED_RISK_SQL} AS r FROM history {where})
+            GROUP BY username""",
+        params
     )
+
+def rebuild_stats_rollup(cur, username: str | None = None):
+    """Recalcula stats_rollup desde 'history' (de un usuario o de todos) dentro de la transacción de `cur`."""
+    where = "WHERE username=?" if username else "WHERE username IS NOT NULL"
+    params = (username,) if username else ()
+    cur.execute(f"DELETE FROM stats_rollup {where}", params)
+    for granularity, (_, bucket_sql) in ROLLUP_GRANULARITIES.items():
+        cur.execute(
+            f"""INSERT INTO stats_rollup
+                    (username,granularity,bucket,type,total,risk_sum,safe_count,suspicious_count,phishing_count)
+                SELECT username, ?, b, type, COUNT(*), SUM(r),
+                       SUM(r<=33), SUM(r>33 AND r<=66), SUM(r>66)
+                FROM (SELECT username, type, {bucket_sql} AS b, {NORMALIZED_RISK_SQL} AS r
+                      FROM history {where} AND length(timestamp)>=13)
+                GROUP BY username, b, type""",
+            (granularity, *params)
+        )
+
+def rebuild_user_stats_db(username: str | None = None):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    rebuild_user_stats(cur, username)
+    rebuild_stats_rollup(cur, username)
     conn.commit()
     conn.close()
 
@@ -26,72 +159,194 @@ def get_history_db(username: str | None = None):
     conn.close()
     return [dict(r) for r in rows]
 
+def get_history_page_db(
+    username: str,
+    cursor: int | None = None,
+    limit: int = 50,
+    type: str | None = None,
+    verdict: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+):
+    """
+    Página del historial del usuario, de más reciente a más antigua, por
+    keyset sobre `id`: devuelve las filas con id < cursor. Usa el índice
+    (username, id), así que el coste no depende de la página pedida.
+
+    Returns:
+        {"items": [...], "next_cursor": id | None, "total": nº de filas con esos filtros}
+        "total" solo se calcula en la primera página (sin cursor); en las
+        siguientes es None. Sin filtros sale de user_stats, sin recorrer history.
+    """
+    where = ["username=?"]
+    params: list = [username]
+    if type:
+        where.append("type=?"); params.append(type)
+    if verdict:
+        where.append("verdict=?"); params.append(verdict)
+    # timestamp se guarda como 'YYYY-MM-DD HH:MM:SS': el orden de texto es el cronológico
+    if date_from:
+        where.append("timestamp>=?"); params.append(date_from)
+    if date_to:
+        where.append("timestamp<=?"); params.append(date_to if len(date_to) > 10 else f"{date_to} 23:59:59")
+    filters = " AND ".join(where)
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+    total = None
+    if cursor is None:
+        if len(where) == 1:
+            cur.execute("SELECT total FROM user_stats WHERE username=?", (username,))
+            row = cur.fetchone()
+            total = row[0] if row else 0
+        else:
+            cur.execute(f"SELECT COUNT(*) FROM history WHERE {filters}", params)
+            total = cur.fetchone()[0]
+
+    page_filters, page_params = filters, list(params)
+    if cursor is not None:
+        page_filters += " AND id<?"; page_params.append(cursor)
+    cur.execute(
+        f"SELECT id,type,input,verdict,percentage,timestamp FROM history WHERE {page_filters} "
+        "ORDER BY id DESC LIMIT ?",
+        page_params + [limit + 1]
+    )
+    rows = [dict(r) for r in cur.fetchall()]
+    conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return {
+        "items": rows,
+        "next_cursor": rows[-1]["id"] if has_more and rows else None,
+        "total": total,
+    }
+
 def clear_history_db(username: str | None = None):
     conn = get_db_conn()
     cur = conn.cursor()
     if username:
         cur.execute("DELETE FROM history WHERE username=?", (username,))
         deleted = cur.rowcount
+        cur.execute("DELETE FROM user_stats WHERE username=?", (username,))
+        cur.execute("DELETE FROM stats_rollup WHERE username=?", (username,))
     else:
         cur.execute("DELETE FROM history")
         deleted = cur.rowcount
+        cur.execute("DELETE FROM user_stats")
+        cur.execute("DELETE FROM stats_rollup")
     conn.commit()
     conn.close()
     return deleted
 
+def get_user_credentials_db(username: str):
+    """Devuelve {password_hash, salt} del usuario o None si no existe."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT password_hash, salt FROM users WHERE username=?", (username,))
+    r = cur.fetchone()
+    conn.close()
+    return dict(r) if r else None
+
 def get_stats_db_for_user(username: str):
+    """Estadísticas del usuario a partir de su fila en user_stats (una lectura por PK)."""
     conn = get_db_conn()
     cur = conn.cursor()
-    
-    # 1. Obtener TODAS las entradas (texto y URL)
     cur.execute(
-        "SELECT type, verdict, percentage FROM history WHERE username=?",
+        "SELECT total,risk_sum,safe_count,suspicious_count,phishing_count FROM user_stats WHERE username=?",
         (username,)
     )
-    rows = cur.fetchall()
+    r = cur.fetchone()
     conn.close()
 
-    total = len(rows)
+    total = r["total"] if r else 0
     if total == 0:
         return {"total": 0, "avg_risk": 0, "safe": 0, "suspicious": 0, "phishing": 0}
 
-    # 2. Normalizar porcentajes
-    # Si tiene porcentaje (texto), usarlo.
-    # Si no (URL), mapear veredicto a un % estimado para la estadística global.
-    normalized_scores = []
-    
-    for r in rows:
-        rtype = r["type"]
-        verdict = r["verdict"]
-        percentage = r["percentage"]
-        
-        if percentage is not None:
-            normalized_scores.append(percentage)
-        else:
-            # Mapeo de veredictos de URL a riesgo numérico
-            if verdict == "Segura":
-                normalized_scores.append(10) # Bajo riesgo
-            elif verdict == "Maliciosa":
-                normalized_scores.append(90) # Alto riesgo
-            else:
-                normalized_scores.append(50) # Sospechosa/Desconocido
-
-    # 3. Calcular métricas
-    avg_risk = sum(normalized_scores) / total if total > 0 else 0
-    
-    # Categorizar según el score normalizado
-    safe_count = len([s for s in normalized_scores if s <= 33])
-    suspicious_count = len([s for s in normalized_scores if 33 < s <= 66])
-    phishing_count = len([s for s in normalized_scores if s > 66])
-
-    safe_pct = (safe_count / total) * 100
-    suspicious_pct = (suspicious_count / total) * 100
-    phishing_pct = (phishing_count / total) * 100
-    
     return {
         "total": total,
-        "avg_risk": int(avg_risk),
-        "safe": int(safe_pct),
-        "suspicious": int(suspicious_pct),
-        "phishing": int(phishing_pct)
-    }
\ No newline at end of file
+        "avg_risk": int(r["risk_sum"] / total),
+        "safe": int(r["safe_count"] / total * 100),
+        "suspicious": int(r["suspicious_count"] / total * 100),
+        "phishing": int(r["phishing_count"] / total * 100)
+    }
+
+def get_stats_rollup_db(
+    username: str,
+    granularity: str = "day",
+    date_from: str | None = None,
+    date_to: str | None = None,
+    type: str | None = None,
+):
+    """
+    Serie temporal de estadísticas del usuario desde stats_rollup: un elemento
+    por (bucket, type) dentro del rango, en orden cronológico. Es un recorrido
+    por rango de la clave primaria (username, granularity, bucket, type).
+    """
+    where = ["username=?", "granularity=?"]
+    params: list = [username, granularity]
+    if date_from:
+        where.append("bucket>=?"); params.append(date_from)
+    if date_to:
+        # Incluye todas las horas del último día si llega solo la fecha
+        where.append("bucket<=?"); params.append(date_to if len(date_to) > 10 else f"{date_to} 23:59")
+    if type:
+        where.append("type=?"); params.append(type)
+
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT bucket,type,total,risk_sum,safe_count,suspicious_count,phishing_count "
+        f"FROM stats_rollup WHERE {' AND '.join(where)} ORDER BY bucket, type",
+        params
+    )
+    rows = cur.fetchall()
+    conn.close()
+
+    return [
+        {
+            "bucket": r["bucket"],
+            "type": r["type"],
+            "total": r["total"],
+            "avg_risk": int(r["risk_sum"] / r["total"]) if r["total"] else 0,
+            "safe": r["safe_count"],
+            "suspicious": r["suspicious_count"],
+            "phishing": r["phishing_count"],
+        }
+        for r in rows
+    ]
+
+def get_llm_cache_db(key: str, now: float):
+    """Devuelve la fila de caché (value, expires_at) si existe y no ha caducado."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT value, expires_at FROM llm_cache WHERE key=? AND expires_at>?", (key, now))
+    row = cur.fetchone()
+    conn.close()
+    return dict(row) if row else None
+
+def put_llm_cache_db(key: str, kind: str, value: str, created_at: float, expires_at: float):
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute(
+        "INSERT OR REPLACE INTO llm_cache (key,kind,value,created_at,expires_at) VALUES (?,?,?,?,?)",
+        (key, kind, value, created_at, expires_at)
+    )
+    conn.commit()
+    conn.close()
+
+def prune_llm_cache_db(now: float, max_rows: int) -> int:
+    """Borra entradas caducadas y, si sobran filas, las que antes caducan."""
+    conn = get_db_conn()
+    cur = conn.cursor()
+    cur.execute("DELETE FROM llm_cache WHERE expires_at<=?", (now,))
+    deleted = cur.rowcount
+    cur.execute(
+        "DELETE FROM llm_cache WHERE key IN "
+        "(SELECT key FROM llm_cache ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+        (max_rows,)
+    )
+    deleted += cur.rowcount
+    conn.commit()
+    conn.close()
+    return deleted
@@ -4,9 +4,21 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse
 from fastapi.staticfiles import StaticFiles  
 import os
+import asyncio
+import logging
 
-from .api.routes import auth, analyze, history, stats
-from .db.database import init_db, migrate_json_history, ensure_db_schema
+from .api.routes import auth, analyze, history, stats, providers
+from .db.database import migrate_json_history, close_thread_connection
+from .db.migrations import run_migrations
+from .services.http_clients import init_http_clients, close_http_clients
+from .db.history_writer import history_writer
+from .db.executor import shutdown_db_executor
+from .core.password_pool import password_pool
+from .core.config import settings
+from .db.async_repository import refresh_token_revocations, purge_expired_sessions
+from .services.blocklist import blocklist
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="PhishGuard AI")
 
@@ -18,14 +30,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+_tasks: list[asyncio.Task] = []
+
+async def _revocations_loop():
+    # Cada worker recarga los tokens firmados revocados por logout en otros workers
+    while True:
+        try:
+            await refresh_token_revocations()
+        except Exception:
+            logger.exception("No se pudo recargar la lista de tokens revocados")
+        await asyncio.sleep(settings.SESSION_REVOCATION_REFRESH_SECONDS)
+
+async def _session_reaper_loop():
+    # Borra periódicamente las sesiones caducadas (la tabla no se limpia sola)
+    while True:
+        try:
+            removed = await purge_expired_sessions(settings.SESSION_REAPER_BATCH)
+            if removed:
+                logger.info("Sesiones caducadas eliminadas: %d", removed)
+        except Exception:
+            logger.exception("No se pudieron purgar las sesiones caducadas")
+        await asyncio.sleep(settings.SESSION_REAPER_INTERVAL_SECONDS)
+
+async def _blocklist_loop():
+    # Recompila/recarga la lista de bloqueo local cuando cambian los feeds o el fichero
+    while True:
+        await asyncio.sleep(settings.BLOCKLIST_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(blocklist.refresh)
+        except Exception:
+            logger.exception("No se pudo actualizar la lista de bloqueo local")
+
 @app.on_event("startup")
 async def startup():
-    init_db(); migrate_json_history(); ensure_db_schema()
+    run_migrations(); migrate_json_history()
+    init_http_clients()
+    history_writer.start()
+    try:
+        await asyncio.to_thread(blocklist.refresh)
+    except Exception:
+        logger.exception("No se pudo cargar la lista de bloqueo local")
+    _tasks.append(asyncio.create_task(_blocklist_loop()))
+    _tasks.append(asyncio.create_task(_session_reaper_loop()))
+    if settings.SESSION_TOKEN_MODE == "signed":
+        _tasks.append(asyncio.create_task(_revocations_loop()))
+
+@app.on_event("shutdown")
+async def shutdown():
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _tasks.clear()
+    await history_writer.stop()
+    await close_http_clients()
+    close_thread_connection()
+    shutdown_db_executor()
+    password_pool.shutdown()
 
 app.include_router(auth.router, prefix="")
 app.include_router(analyze.router, prefix="")
 app.include_router(history.router, prefix="")
 app.include_router(stats.router, prefix="")
+app.include_router(providers.router, prefix="")
 
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
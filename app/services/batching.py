@@ -0,0 +1,79 @@
+# app/services/batching.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Agrupa peticiones que llegan dentro de una ventana corta y las procesa
+    juntas con `handler(group, items)`, que debe devolver una lista con un
+    resultado (o una excepción) por item, en el mismo orden.
+
+    Un lote se envía al cumplirse `window_ms` desde su primer item o al
+    alcanzar `max_items`, lo que ocurra antes. Items con distinto `group`
+    (p.ej. distinto endpoint/clave) nunca se mezclan.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Hashable, list], Awaitable[list]],
+        window_ms: float,
+        max_items: int
+    ):
+        self.handler = handler
+        self.window = window_ms / 1000.0
+        self.max_items = max(1, max_items)
+        self._pending: dict[Hashable, list[tuple[Any, asyncio.Future]]] = {}
+        self._timers: dict[Hashable, asyncio.TimerHandle] = {}
+        # asyncio solo guarda referencias débiles a las tareas: sin este set un
+        # lote en vuelo podría recolectarse y dejar colgados a sus llamantes
+        self._tasks: set[asyncio.Task] = set()
+        self.counters = {"items": 0, "batches": 0}
+
+    async def submit(self, group: Hashable, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        batch = self._pending.setdefault(group, [])
+        batch.append((item, fut))
+        self.counters["items"] += 1
+
+        if len(batch) >= self.max_items:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.window, self._flush, group)
+
+        return await fut
+
+    def _flush(self, group: Hashable) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(group, [])
+        # Los que ya no esperan (cancelados) no se envían
+        batch = [(item, fut) for item, fut in batch if not fut.done()]
+        if batch:
+            self.counters["batches"] += 1
+            task = asyncio.create_task(self._run(group, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Hashable, batch: list) -> None:
+        items = [item for item, _ in batch]
+        try:
+            results = await self.handler(group, items)
+        except Exception as e:
+            results = [e] * len(batch)
+        if len(results) != len(batch):
+            err = RuntimeError("El lote devolvió un número de resultados distinto al de items")
+            results = [err] * len(batch)
+
+        for (_, fut), res in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(res, BaseException):
+                fut.set_exception(res)
+            else:
+                fut.set_result(res)
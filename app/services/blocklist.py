@@ -0,0 +1,223 @@
+# app/services/blocklist.py
+"""
+Lista de bloqueo local de dominios/URLs (feeds propios, sin red).
+
+Los feeds (un host o URL por línea; admite formato hosts "0.0.0.0 host",
+"||host^" y comentarios con #) se compilan a un único fichero binario:
+
+    cabecera | filtro de Bloom | tabla ordenada de huellas de 8 bytes
+
+El fichero se abre con mmap, así que cargarlo cuesta lo mismo con mil entradas
+que con millones. Una consulta prueba primero el Bloom (casi siempre basta para
+descartar) y confirma con búsqueda binaria en la tabla exacta.
+
+Hot-swap: la compilación escribe a un temporal y lo renombra (os.replace), y
+`refresh` abre el fichero nuevo y cambia la referencia de golpe; las consultas
+en curso terminan con el mmap anterior.
+"""
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+import threading
+from math import ceil, log
+from typing import Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PGBLOOM1"
+_HEADER = struct.Struct("<8sQQQ")  # magic, bits del Bloom, nº de hashes, nº de entradas
+_KEY = struct.Struct(">Q")
+
+
+def _digest(key: str) -> bytes:
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+
+
+def normalize_host(host: str) -> str:
+    return host.strip().strip(".").lower()
+
+
+def normalize_url(url: str) -> str:
+    """host + ruta (+ query), sin esquema, fragmento ni barra final."""
+    parts = urlsplit(url if "://" in url else "http://" + url)
+    host = normalize_host(parts.hostname or "")
+    path = parts.path.rstrip("/")
+    return f"{host}{path}?{parts.query}" if parts.query else f"{host}{path}"
+
+
+def _feed_entries(path: str) -> Iterator[str]:
+    with open(path, encoding="utf-8", errors="ignore") as fh:
+        for line in fh:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            line = line.split()[-1]  # formato hosts: "0.0.0.0 dominio"
+            if line.startswith("||"):
+                line = line[2:].rstrip("^")
+            if "/" in line:
+                yield normalize_url(line)
+            else:
+                yield normalize_host(line)
+
+
+def compile_blocklist(feed_paths: Iterable[str], out_path: str,
+                      fp_rate: float | None = None) -> int:
+    """Compila los feeds a `out_path` de forma atómica. Devuelve el nº de entradas."""
+    fp_rate = fp_rate or settings.BLOCKLIST_FP_RATE
+    digests = set()
+    for path in feed_paths:
+        for entry in _feed_entries(path):
+            if entry:
+                digests.add(_digest(entry))
+    n = len(digests)
+    m = max(64, ceil(-n * log(fp_rate) / (log(2) ** 2)))
+    k = max(1, round(m / max(n, 1) * log(2)))
+
+    bloom = bytearray(ceil(m / 8))
+    keys = []
+    for d in digests:
+        h1, h2 = int.from_bytes(d[:8], "big"), int.from_bytes(d[8:], "big") | 1
+        for i in range(k):
+            bit = (h1 + i * h2) % m
+            bloom[bit >> 3] |= 1 << (bit & 7)
+        keys.append(d[:8])
+    keys.sort()
+
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as fh:
+        fh.write(_HEADER.pack(_MAGIC, m, k, n))
+        fh.write(bloom)
+        fh.write(b"".join(keys))
+    os.replace(tmp_path, out_path)
+    logger.info(f"Lista de bloqueo compilada: {n} entradas, {len(bloom)} bytes de Bloom, k={k}")
+    return n
+
+
+class Blocklist:
+    """Un fichero compilado abierto con mmap (solo lectura)."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self._m, self._k, self.size = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} no es una lista de bloqueo compilada")
+        self._bloom_offset = _HEADER.size
+        self._table_offset = self._bloom_offset + ceil(self._m / 8)
+
+    def _in_bloom(self, d: bytes) -> bool:
+        h1, h2 = int.from_bytes(d[:8], "big"), int.from_bytes(d[8:], "big") | 1
+        mm, base, m = self._mm, self._bloom_offset, self._m
+        for i in range(self._k):
+            bit = (h1 + i * h2) % m
+            if not mm[base + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def _in_table(self, key: bytes) -> bool:
+        lo, hi = 0, self.size
+        mm, base = self._mm, self._table_offset
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = mm[base + mid * 8: base + mid * 8 + 8]
+            if probe == key:
+                return True
+            if probe < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return False
+
+    def __contains__(self, entry: str) -> bool:
+        d = _digest(entry)
+        return self._in_bloom(d) and self._in_table(d[:8])
+
+
+class BlocklistEngine:
+    def __init__(self, path: str, feeds_dir: str | None = None):
+        self.path = path
+        self.feeds_dir = feeds_dir
+        self.generation = 0  # cambia con cada hot-swap
+        self._current: Optional[Blocklist] = None
+        self._mtime: float | None = None
+        self._lock = threading.Lock()
+
+    def _feed_files(self) -> List[str]:
+        if not self.feeds_dir or not os.path.isdir(self.feeds_dir):
+            return []
+        return sorted(
+            os.path.join(self.feeds_dir, name) for name in os.listdir(self.feeds_dir)
+            if os.path.isfile(os.path.join(self.feeds_dir, name)) and not name.startswith(".")
+        )
+
+    def refresh(self) -> bool:
+        """
+        Recompila si algún feed es más nuevo que el fichero compilado y vuelve a
+        abrir el fichero si ha cambiado. Devuelve True si hubo hot-swap.
+        """
+        with self._lock:
+            feeds = self._feed_files()
+            compiled = os.path.getmtime(self.path) if os.path.exists(self.path) else None
+            if feeds and (compiled is None or max(os.path.getmtime(f) for f in feeds) > compiled):
+                compile_blocklist(feeds, self.path)
+            if not os.path.exists(self.path):
+                return False
+            mtime = os.path.getmtime(self.path)
+            if mtime == self._mtime:
+                return False
+            blocklist = Blocklist(self.path)
+            self._current, self._mtime = blocklist, mtime
+            self.generation += 1
+        logger.info(f"Lista de bloqueo cargada: {blocklist.size} entradas (generación {self.generation})")
+        return True
+
+    @property
+    def loaded(self) -> bool:
+        return self._current is not None
+
+    def check_url(self, url: str) -> Optional[Dict[str, str]]:
+        """
+        {"match": "url"|"host", "entry": ...} si la URL, su host o algún dominio
+        padre del host está en la lista; None si no (o si no hay lista cargada).
+        """
+        current = self._current
+        if current is None or not current.size:
+            return None
+        try:
+            key = normalize_url(url)
+            host = normalize_host(urlsplit(url if "://" in url else "http://" + url).hostname or "")
+        except ValueError:
+            return None
+        if key != host and key in current:
+            return {"match": "url", "entry": key}
+        labels = host.split(".")
+        for i in range(len(labels) - 1 if len(labels) > 1 else 1):
+            candidate = ".".join(labels[i:])
+            if candidate in current:
+                return {"match": "host", "entry": candidate}
+        return None
+
+    def stats(self) -> Dict:
+        current = self._current
+        return {
+            "loaded": current is not None,
+            "entries": current.size if current else 0,
+            "generation": self.generation,
+            "path": self.path,
+        }
+
+
+blocklist = BlocklistEngine(settings.BLOCKLIST_FILE, settings.BLOCKLIST_FEEDS_DIR)
+
+
+if __name__ == "__main__":
+    # python -m app.services.blocklist salida.bin feed1.txt [feed2.txt ...]
+    if len(sys.argv) < 3:
+        sys.exit("uso: python -m app.services.blocklist salida.bin feed1.txt [feed2.txt ...]")
+    compile_blocklist(sys.argv[2:], sys.argv[1])
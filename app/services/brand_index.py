@@ -0,0 +1,301 @@
+# app/services/brand_index.py
+"""
+Índice de marcas protegidas para detectar suplantación en dominios.
+
+El dominio se reduce a su etiqueta registrada ("paypa1-login" en
+"secure.paypa1-login.com") y se compara con las marcas:
+
+- homoglyph: mismo "esqueleto" que la marca (homóglifos y caracteres
+  confundibles → forma canónica) pero distinta escritura (paypa1, g00gle)
+- typo: a distancia de edición 1-2 de la marca sobre la etiqueta tal cual,
+  con la misma primera letra (amazom, gooogle)
+- embedded: la marca como segmento entre guiones (paypal-secure)
+- subdomain: la marca como subdominio de un dominio ajeno, solo con una
+  segunda señal (TLD de riesgo, guiones o palabras de cebo en el host, o un
+  TLD en medio: paypal.evil.tk, paypal.com.verify.net). La marca sola como
+  subdominio es habitual en sitios legítimos (apple.stackexchange.com,
+  google.github.io, outlook.empresa.com para OWA).
+
+Cada marca tiene además sus dominios propios (googleapis, amazonaws, live...),
+que nunca se marcan y en los que la marca como subdominio es legítima.
+
+La distancia se resuelve con un índice de vecindario por borrados (estilo
+SymSpell): cada marca se indexa con todas sus variantes de hasta k borrados y
+la consulta genera las suyas, así que el coste no depende del número de marcas.
+"""
+import logging
+import os
+import unicodedata
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Set
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Caracteres confundibles más habituales (dígitos, cirílico, griego). La i, la l
+# y el 1 se unifican porque en muchas fuentes son indistinguibles.
+_CONFUSABLES = str.maketrans({
+    "0": "o", "1": "l", "i": "l", "|": "l", "!": "l", "3": "e", "4": "a",
+    "5": "s", "7": "t", "8": "b", "9": "g", "$": "s", "@": "a",
+    "а": "a", "в": "b", "е": "e", "ѕ": "s", "і": "l", "ј": "j", "к": "k",
+    "м": "m", "н": "h", "о": "o", "р": "p", "с": "c", "т": "t", "у": "y",
+    "х": "x", "ԁ": "d", "ɡ": "g", "ο": "o", "α": "a", "ε": "e", "ι": "l",
+    "κ": "k", "ν": "v", "ρ": "p", "τ": "t", "υ": "u", "χ": "x",
+})
+_MULTI_CONFUSABLES = (("rn", "m"), ("vv", "w"), ("cl", "d"))
+
+# Segundos niveles típicos bajo ccTLD (co.uk, com.es, gob.mx...)
+_SECOND_LEVELS = {"co", "com", "org", "net", "gob", "gov", "edu", "ac", "nom", "ne", "or"}
+
+# TLDs gratuitos o muy usados en spam (también los usa scoring.py)
+HIGH_RISK_TLDS = (".tk", ".ml", ".ga", ".cf", ".gq", ".xyz", ".top", ".club", ".work")
+
+# Señales que acompañan a una marca usada como subdominio en un host de phishing
+_LURE_WORDS = {
+    "login", "signin", "logon", "secure", "security", "account", "verify",
+    "verification", "update", "confirm", "auth", "support", "billing", "wallet",
+    "recovery", "unlock", "webscr", "cuenta", "acceso", "verificar",
+}
+_TLD_LIKE = {"com", "net", "org", "es", "info", "biz"}
+
+# (marcas, etiquetas registradas propias del mismo titular). Todas las marcas
+# de un grupo son también dominios propios de las demás.
+DEFAULT_BRAND_GROUPS = (
+    (("microsoft", "microsoftonline", "office365", "outlook", "hotmail"),
+     ("live", "office", "msn", "windows", "azure", "sharepoint", "skype", "bing", "microsoft365")),
+    (("google", "gmail"),
+     ("googleapis", "gstatic", "googleusercontent", "googlemail", "googlevideo", "ggpht",
+      "youtube", "ytimg", "doubleclick", "blogspot", "withgoogle")),
+    (("apple", "appleid", "icloud"), ("mzstatic", "cdn-apple", "me")),
+    (("amazon",), ("amazonaws", "media-amazon", "ssl-images-amazon", "primevideo", "cloudfront", "a2z")),
+    (("paypal",), ("paypalobjects", "paypal-communication", "paypal-community")),
+    (("netflix",), ("nflxvideo", "nflximg", "nflxext", "nflxso")),
+    (("facebook", "instagram", "whatsapp"),
+     ("fbcdn", "fb", "cdninstagram", "messenger", "meta", "whatsapp-net")),
+    (("linkedin",), ("licdn",)),
+    (("dropbox",), ("dropboxusercontent", "dropboxapi", "dropboxstatic")),
+    (("docusign",), ()), (("adobe",), ("adobelogin", "typekit")),
+    (("binance",), ()), (("coinbase",), ()),
+    (("santander",), ("bancosantander", "santanderconsumer")), (("bbva",), ("bbvanet",)),
+    (("caixabank",), ("lacaixa", "caixabanknow")), (("bankinter",), ()), (("sabadell",), ("bancsabadell",)),
+    (("ingdirect",), ("ing",)), (("openbank",), ()), (("unicaja",), ("unicajabanco",)),
+    (("correos",), ()), (("seur",), ()), (("dhl",), ()), (("fedex",), ()), (("ups",), ()),
+    (("agenciatributaria",), ("aeat",)), (("movistar",), ("telefonica",)),
+    (("vodafone",), ()), (("orange",), ()), (("mercadolibre",), ("mercadopago", "mlstatic")),
+)
+
+
+def default_protected_brands() -> Dict[str, Set[str]]:
+    brands: Dict[str, Set[str]] = {}
+    for names, owned in DEFAULT_BRAND_GROUPS:
+        for name in names:
+            brands[name] = set(names) | set(owned)
+    return brands
+
+
+def skeleton(text: str) -> str:
+    """Forma canónica para comparar: sin acentos, minúsculas y confundibles unificados."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    for seq, repl in _MULTI_CONFUSABLES:
+        text = text.replace(seq, repl)
+    return text.translate(_CONFUSABLES)
+
+
+def _max_distance(brand: str) -> int:
+    # Con marcas cortas cualquier distancia casa con palabras corrientes
+    # (gmail/email, apple/apply)
+    if len(brand) <= 5:
+        return 0
+    if len(brand) <= 8:
+        return 1
+    return 2
+
+
+def _deletions(word: str, depth: int) -> Set[str]:
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+def _osa_distance(a: str, b: str, limit: int) -> int:
+    """Distancia de edición con transposiciones (OSA); corta en limit + 1."""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2 = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if (prev2 is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                cur[j] = min(cur[j], prev2[j - 2] + 1)
+        if min(cur) > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1]
+
+
+def _decode_label(label: str) -> str:
+    if label.startswith("xn--"):
+        try:
+            return label.encode("ascii").decode("idna")
+        except UnicodeError:
+            pass
+    return label
+
+
+def split_host(host: str) -> tuple[str, List[str]]:
+    """(etiqueta registrada, resto de etiquetas) de un host o netloc."""
+    host = host.rsplit("@", 1)[-1].split(":", 1)[0].strip(".").lower()
+    labels = [_decode_label(label) for label in host.split(".") if label]
+    if not labels:
+        return "", []
+    if len(labels) >= 3 and labels[-2] in _SECOND_LEVELS and len(labels[-1]) == 2:
+        idx = len(labels) - 3
+    elif len(labels) >= 2:
+        idx = len(labels) - 2
+    else:
+        idx = 0
+    return labels[idx], labels[:idx]
+
+
+class BrandIndex:
+    def __init__(self, brands: Dict[str, Iterable[str]], cache_size: int = 65536):
+        """`brands`: marca -> etiquetas registradas propias del titular."""
+        self.brands: Dict[str, Set[str]] = {}
+        for brand, owned in brands.items():
+            brand = brand.strip().lower()
+            if brand:
+                self.brands[brand] = {o.strip().lower() for o in owned if o.strip()} | {brand}
+        # Etiquetas registradas que nunca se marcan (marcas y dominios propios)
+        self._legit: Set[str] = set().union(*self.brands.values()) if self.brands else set()
+        # esqueleto -> marcas; variante por borrados (de la marca tal cual) -> marcas
+        self._by_skeleton: Dict[str, Set[str]] = {}
+        self._neighbourhood: Dict[str, Set[str]] = {}
+        # longitud de la consulta -> nº de borrados a generar
+        self._depth_for_len: Dict[int, int] = {}
+        for brand in self.brands:
+            self._by_skeleton.setdefault(skeleton(brand), set()).add(brand)
+            depth = _max_distance(brand)
+            if not depth:
+                continue
+            for variant in _deletions(brand, depth):
+                self._neighbourhood.setdefault(variant, set()).add(brand)
+            for length in range(len(brand) - depth, len(brand) + depth + 1):
+                self._depth_for_len[length] = max(self._depth_for_len.get(length, 0), depth)
+        # Los dominios se repiten mucho (logs, correos masivos): caché por host
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def __len__(self) -> int:
+        return len(self.brands)
+
+    def _brand_for(self, skel: str) -> str:
+        return min(self._by_skeleton[skel])
+
+    def _match_token(self, token: str) -> Optional[Dict]:
+        if token in self.brands:
+            return {"brand": token, "kind": "embedded", "distance": 0}
+        skel = skeleton(token)
+        if skel in self._by_skeleton:
+            return {"brand": self._brand_for(skel), "kind": "homoglyph", "distance": 0}
+        depth = self._depth_for_len.get(len(token), 0)
+        if not depth:
+            return None
+        best = None
+        for variant in _deletions(token, depth):
+            for brand in self._neighbourhood.get(variant, ()):
+                # Las erratas casi nunca tocan la primera letra; exigirla evita
+                # casar palabras corrientes (cloud/icloud)
+                if brand[0] != token[0]:
+                    continue
+                # Plurales y derivados de la marca (oranges, paypals) son
+                # palabras, no erratas; sí lo es repetir la última letra (googlee)
+                suffix = token[len(brand):]
+                if token.startswith(brand) and suffix.strip(brand[-1]):
+                    continue
+                limit = _max_distance(brand)
+                dist = _osa_distance(token, brand, limit)
+                if 0 < dist <= limit and (best is None or (dist, brand) < best):
+                    best = (dist, brand)
+        if best:
+            return {"brand": best[1], "kind": "typo", "distance": best[0]}
+        return None
+
+    def _lookup(self, host: str) -> Optional[Dict]:
+        """
+        Primera coincidencia sospechosa del host con una marca protegida, o None.
+        {"brand", "label", "kind", "distance"}. Un dominio cuya etiqueta registrada
+        es una marca de la lista o un dominio propio de alguna se considera legítimo.
+        """
+        label, subdomains = split_host(host)
+        if not label or label in self._legit or label.replace("-", "").isdigit():
+            return None
+        tokens = [t for t in label.split("-") if t]
+        # La etiqueta completa no puede ser "embedded": sería la marca exacta
+        candidates = [label] + tokens if len(tokens) > 1 else [label]
+        for candidate in candidates:
+            match = self._match_token(candidate)
+            if match and not (match["kind"] == "embedded" and candidate == label):
+                return {**match, "label": label}
+        if not subdomains or not self._has_lure(host, label, subdomains):
+            return None
+        for sub in subdomains:
+            for token in sub.split("-"):
+                skel = skeleton(token)
+                if skel not in self._by_skeleton:
+                    continue
+                brand = token if token in self.brands else self._brand_for(skel)
+                if label in self.brands[brand]:
+                    continue  # subdominio en un dominio del propio titular
+                return {"brand": brand, "label": label, "kind": "subdomain", "distance": 0}
+        return None
+
+    @staticmethod
+    def _has_lure(host: str, label: str, subdomains: List[str]) -> bool:
+        """Segunda señal para la regla de subdominio (la marca sola no basta)."""
+        host = host.rsplit("@", 1)[-1].split(":", 1)[0].strip(".").lower()
+        if "-" in label or host.endswith(HIGH_RISK_TLDS):
+            return True
+        tokens = {t for part in subdomains + [label] for t in part.split("-")}
+        return bool(tokens & _LURE_WORDS) or any(sub in _TLD_LIKE for sub in subdomains)
+
+
+def _parse_brand(entry: str, brands: Dict[str, Set[str]]) -> None:
+    """"marca" o "marca=propio1|propio2" (etiquetas registradas del titular)."""
+    name, _, owned = entry.strip().partition("=")
+    if name.strip():
+        brands.setdefault(name.strip().lower(), set()).update(o for o in owned.split("|") if o.strip())
+
+
+def load_protected_brands() -> Dict[str, Set[str]]:
+    """
+    PROTECTED_BRANDS (lista separada por comas; vacío = grupos por defecto)
+    + PROTECTED_BRANDS_FILE (una marca por línea). Ambos admiten "marca=propio1|propio2".
+    """
+    brands: Dict[str, Set[str]] = {}
+    if settings.PROTECTED_BRANDS:
+        for entry in settings.PROTECTED_BRANDS.split(","):
+            _parse_brand(entry, brands)
+    else:
+        brands = default_protected_brands()
+    path = settings.PROTECTED_BRANDS_FILE
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip() and not line.startswith("#"):
+                    _parse_brand(line, brands)
+    elif path:
+        logger.warning(f"PROTECTED_BRANDS_FILE no encontrado: {path}")
+    return brands
+
+
+brand_index = BrandIndex(load_protected_brands())
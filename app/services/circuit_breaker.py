@@ -0,0 +1,182 @@
+# app/services/circuit_breaker.py
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Mensajes de cancelación (task.cancel(msg)) que distinguen por qué se cortó la llamada
+CANCEL_DEADLINE = "deadline"
+CANCEL_DECIDED = "decided"
+
+
+class CircuitOpenError(Exception):
+    """El proveedor tiene el circuito abierto: no se intenta la llamada."""
+
+
+class _Guard:
+    """Mide una llamada protegida por el breaker (ver CircuitBreaker.guard)."""
+
+    def __init__(self, breaker: "CircuitBreaker"):
+        self.breaker = breaker
+        self.failed = False
+        self._start = 0.0
+
+    def mark_failure(self) -> None:
+        """Marca la llamada como fallida aunque no haya lanzado excepción (p.ej. HTTP 5xx)."""
+        self.failed = True
+
+    async def __aenter__(self):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuito abierto para {self.breaker.name}")
+        self._start = time.monotonic()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        latency = time.monotonic() - self._start
+        if exc_type is not None and issubclass(exc_type, asyncio.CancelledError):
+            # Cortada por el deadline o tras tardar ya más de slow_call_seconds:
+            # cuenta como mala (un proveedor colgado tiene que abrir el circuito).
+            # La decisión anticipada y el resto de cancelaciones rápidas no cuentan.
+            reason = exc.args[0] if exc is not None and exc.args else None
+            if reason != CANCEL_DECIDED and (
+                reason == CANCEL_DEADLINE or latency >= self.breaker.slow_call_seconds
+            ):
+                self.breaker.record(ok=False, latency=latency)
+            else:
+                self.breaker.release()
+        else:
+            self.breaker.record(ok=exc_type is None and not self.failed, latency=latency)
+        return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker por proveedor con ventana deslizante de llamadas.
+
+    - closed: se llama normalmente. Si en la ventana (mín. `min_calls`) la
+      proporción de llamadas malas (error o más lentas que `slow_call_seconds`)
+      supera `failure_threshold`, pasa a open.
+    - open: no se llama durante `open_seconds`; después pasa a half_open.
+    - half_open: se permiten hasta `half_open_max_calls` sondas; si todas van
+      bien se cierra, si alguna falla se vuelve a abrir.
+
+    También calcula un timeout adaptativo a partir del p95 de latencia observado.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int,
+        min_calls: int,
+        failure_threshold: float,
+        slow_call_seconds: float,
+        open_seconds: float,
+        half_open_max_calls: int,
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_threshold = failure_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self._calls: deque[tuple[bool, float]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_inflight = 0
+        self._probes_ok = 0
+
+    def guard(self) -> _Guard:
+        """Context manager async: `async with breaker.guard() as g: ...`"""
+        return _Guard(self)
+
+    def allow(self) -> bool:
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                return False
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes_inflight >= self.half_open_max_calls:
+                return False
+            self._probes_inflight += 1
+        return True
+
+    def release(self) -> None:
+        if self.state == HALF_OPEN and self._probes_inflight > 0:
+            self._probes_inflight -= 1
+
+    def record(self, ok: bool, latency: float) -> None:
+        bad = not ok or latency > self.slow_call_seconds
+        self._calls.append((bad, latency))
+
+        if self.state == HALF_OPEN:
+            self.release()
+            if bad:
+                self._transition(OPEN)
+            else:
+                self._probes_ok += 1
+                if self._probes_ok >= self.half_open_max_calls:
+                    self._transition(CLOSED)
+        elif self.state == CLOSED and len(self._calls) >= self.min_calls:
+            if self._failure_rate() >= self.failure_threshold:
+                self._transition(OPEN)
+
+    def adaptive_timeout(self, ceiling: float) -> float:
+        """p95 de latencia × multiplicador, acotado entre el mínimo configurado y `ceiling`."""
+        latencies = sorted(lat for _, lat in self._calls)
+        if len(latencies) < self.min_calls:
+            return ceiling
+        p95 = latencies[min(len(latencies) - 1, math.ceil(0.95 * len(latencies)) - 1)]
+        return max(settings.BREAKER_MIN_TIMEOUT, min(ceiling, p95 * settings.BREAKER_TIMEOUT_MULTIPLIER))
+
+    def _failure_rate(self) -> float:
+        return sum(1 for bad, _ in self._calls if bad) / len(self._calls) if self._calls else 0.0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        logger.warning(f"Circuit breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._probes_inflight = 0
+        self._probes_ok = 0
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        elif state == CLOSED:
+            self._calls.clear()
+
+    def snapshot(self, ceiling: float) -> dict:
+        return {
+            "state": self.state,
+            "calls_in_window": len(self._calls),
+            "failure_rate": round(self._failure_rate(), 3),
+            "adaptive_timeout": round(self.adaptive_timeout(ceiling), 3),
+            "open_for": (
+                max(0.0, round(self.open_seconds - (time.monotonic() - self._opened_at), 1))
+                if self.state == OPEN else 0.0
+            ),
+        }
+
+
+def _make_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        window=settings.BREAKER_WINDOW,
+        min_calls=settings.BREAKER_MIN_CALLS,
+        failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+        slow_call_seconds=settings.BREAKER_SLOW_CALL_SECONDS,
+        open_seconds=settings.BREAKER_OPEN_SECONDS,
+        half_open_max_calls=settings.BREAKER_HALF_OPEN_CALLS,
+    )
+
+
+gemini_breaker = _make_breaker("gemini")
+safe_browsing_breaker = _make_breaker("safe_browsing")
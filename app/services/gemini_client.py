@@ -1,23 +1,37 @@
 import os
 import re
+import asyncio
 import logging
 import json
 from typing import Any, Dict, Optional
 import httpx
+from .http_clients import get_gemini_client
+from .verdict_cache import verdict_cache, cache_key
+from .batching import MicroBatcher
+from .circuit_breaker import gemini_breaker, CircuitOpenError
+from ..core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Versiones de los prompts: forman parte de la clave de caché, así que hay que
+# incrementarlas al cambiar el texto de un prompt para invalidar lo cacheado.
+TEXT_PROMPT_VERSION = "text-v1"
+URL_PROMPT_VERSION = "url-v1"
+
 
 async def _post_to_gemini(
     prompt: str, 
     gemini_key: str, 
     gemini_url: str, 
     max_tokens: int = 400, 
-    timeout: float = 15.0
+    timeout: Optional[float] = None
 ) -> httpx.Response:
     """
-    Realiza POST a la API de Google Gemini.
+    Realiza POST a la API de Google Gemini usando el cliente HTTP compartido.
+    Sin timeout explícito se usa GEMINI_TIMEOUT.
     """
+    if timeout is None:
+        timeout = settings.GEMINI_TIMEOUT
     headers = {
         "Content-Type": "application/json"
     }
@@ -48,19 +62,26 @@ async def _post_to_gemini(
             "max_tokens": max_tokens
         }
     
-    async with httpx.AsyncClient(timeout=timeout) as client:
-        try:
+    client = get_gemini_client()
+    try:
+        # Con el circuito abierto lanza CircuitOpenError sin tocar la red
+        async with gemini_breaker.guard():
             logger.info(f"Llamando a Gemini API: {gemini_url}")
-            response = await client.post(url_with_key, json=payload, headers=headers)
+            response = await client.post(
+                url_with_key, json=payload, headers=headers,
+                timeout=gemini_breaker.adaptive_timeout(timeout)
+            )
             response.raise_for_status()
-            logger.info(f"Respuesta de Gemini: {response.status_code}")
-            return response
-        except httpx.HTTPStatusError as e:
-            logger.error(f"HTTP error from Gemini: {e.response.status_code} - {e.response.text}")
-            raise
-        except Exception as e:
-            logger.error(f"Error calling Gemini API: {e}")
-            raise
+        logger.info(f"Respuesta de Gemini: {response.status_code}")
+        return response
+    except CircuitOpenError:
+        raise
+    except httpx.HTTPStatusError as e:
+        logger.error(f"HTTP error from Gemini: {e.response.status_code} - {e.response.text}")
+        raise
+    except Exception as e:
+        logger.error(f"Error calling Gemini API: {e}")
+        raise
 
 
 def _parse_gemini_response(response_data: dict) -> str:
@@ -171,12 +192,21 @@ def _parse_provider_text_response(text_resp: str) -> Dict[str, Any]:
     }
 
 
+def _is_parsed(result: Dict[str, Any]) -> bool:
+    """
+    True si el veredicto viene del JSON de Gemini. El fallback heurístico
+    (respuesta truncada o con texto de más, "raw" es un str) no se cachea:
+    se serviría durante LLM_CACHE_TTL_SECONDS.
+    """
+    return isinstance(result.get("raw"), dict)
+
+
 async def analyze_text(
     text: str,
     gemini_key: Optional[str] = None,
     gemini_url: Optional[str] = None,
     max_tokens: int = 500,
-    timeout: float = 15.0
+    timeout: Optional[float] = None
 ) -> Dict[str, Any]:
     """Analiza texto usando la API de Gemini."""
     
@@ -185,7 +215,39 @@ async def analyze_text(
     
     if not gemini_key or not gemini_url:
         raise RuntimeError("Gemini API not configured (GEMINI_API_KEY and GEMINI_API_URL required)")
-    
+
+    key = cache_key("texto", text, TEXT_PROMPT_VERSION, gemini_url)
+    if settings.LLM_CACHE_ENABLED:
+        cached = await verdict_cache.get(key)
+        if cached is not None:
+            logger.info("Veredicto de texto servido desde caché")
+            return cached
+
+    try:
+        if settings.GEMINI_BATCH_ENABLED:
+            result = await gemini_batcher.submit(
+                (gemini_key, gemini_url, timeout),
+                {"kind": "texto", "content": text, "max_tokens": max_tokens}
+            )
+        else:
+            result = await _analyze_text_single(text, gemini_key, gemini_url, max_tokens, timeout)
+    except Exception as e:
+        logger.error(f"Error in analyze_text: {e}")
+        raise
+
+    if settings.LLM_CACHE_ENABLED and _is_parsed(result):
+        await verdict_cache.put(key, "texto", result)
+    return result
+
+
+async def _analyze_text_single(
+    text: str,
+    gemini_key: str,
+    gemini_url: str,
+    max_tokens: int = 500,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Una llamada a Gemini para un único texto."""
     prompt = (
         "Eres un experto en ciberseguridad especializado en detectar phishing. "
         "Analiza el siguiente texto y determina si es phishing, sospechoso o seguro.\n\n"
@@ -200,23 +262,18 @@ async def analyze_text(
         "Responde solo con el JSON, sin texto adicional:"
     )
     
+    resp = await _post_to_gemini(prompt, gemini_key, gemini_url, max_tokens, timeout)
+    
+    # Parsear respuesta según el formato
     try:
-        resp = await _post_to_gemini(prompt, gemini_key, gemini_url, max_tokens, timeout)
-        
-        # Parsear respuesta según el formato
-        try:
-            response_data = resp.json()
-            text_content = _parse_gemini_response(response_data)
-            logger.info(f"Contenido extraído de Gemini: {text_content[:200]}...")
-        except Exception as e:
-            logger.warning(f"Error parseando JSON de respuesta: {e}")
-            text_content = resp.text
-        
-        return _parse_provider_text_response(text_content)
-        
+        response_data = resp.json()
+        text_content = _parse_gemini_response(response_data)
+        logger.info(f"Contenido extraído de Gemini: {text_content[:200]}...")
     except Exception as e:
-        logger.error(f"Error in analyze_text: {e}")
-        raise
+        logger.warning(f"Error parseando JSON de respuesta: {e}")
+        text_content = resp.text
+    
+    return _parse_provider_text_response(text_content)
 
 
 async def analyze_url(
@@ -224,7 +281,7 @@ async def analyze_url(
     gemini_key: Optional[str] = None,
     gemini_url: Optional[str] = None,
     max_tokens: int = 300,
-    timeout: float = 10.0
+    timeout: Optional[float] = None
 ) -> Dict[str, Any]:
     """Analiza una URL usando la API de Gemini."""
     
@@ -233,7 +290,39 @@ async def analyze_url(
     
     if not gemini_key or not gemini_url:
         raise RuntimeError("Gemini API not configured")
-    
+
+    key = cache_key("url", url, URL_PROMPT_VERSION, gemini_url)
+    if settings.LLM_CACHE_ENABLED:
+        cached = await verdict_cache.get(key)
+        if cached is not None:
+            logger.info(f"Veredicto de URL servido desde caché: {url}")
+            return cached
+
+    try:
+        if settings.GEMINI_BATCH_ENABLED:
+            result = await gemini_batcher.submit(
+                (gemini_key, gemini_url, timeout),
+                {"kind": "url", "content": url, "max_tokens": max_tokens}
+            )
+        else:
+            result = await _analyze_url_single(url, gemini_key, gemini_url, max_tokens, timeout)
+    except Exception as e:
+        logger.error(f"Error in analyze_url: {e}")
+        raise
+
+    if settings.LLM_CACHE_ENABLED and _is_parsed(result):
+        await verdict_cache.put(key, "url", result)
+    return result
+
+
+async def _analyze_url_single(
+    url: str,
+    gemini_key: str,
+    gemini_url: str,
+    max_tokens: int = 300,
+    timeout: Optional[float] = None
+) -> Dict[str, Any]:
+    """Una llamada a Gemini para una única URL."""
     prompt = (
         "Eres un experto en ciberseguridad. Analiza la siguiente URL y determina si es maliciosa.\n\n"
         "IMPORTANTE: Responde ÚNICAMENTE con un objeto JSON válido (sin markdown) con esta estructura:\n"
@@ -246,62 +335,168 @@ async def analyze_url(
         "Responde solo con el JSON:"
     )
     
+    resp = await _post_to_gemini(prompt, gemini_key, gemini_url, max_tokens, timeout)
+    
     try:
-        resp = await _post_to_gemini(prompt, gemini_key, gemini_url, max_tokens, timeout)
+        response_data = resp.json()
+        text_content = _parse_gemini_response(response_data)
+    except:
+        text_content = resp.text
+    
+    return _parse_url_response(text_content)
+
+
+def _strip_code_fences(text: str) -> str:
+    """Quita los bloques ```json ... ``` que a veces envuelven la respuesta."""
+    text_clean = text.strip()
+    if "```json" in text_clean:
+        start = text_clean.find("```json") + 7
+        end = text_clean.find("```", start)
+        if end > start:
+            text_clean = text_clean[start:end].strip()
+    elif text_clean.startswith("```") and text_clean.endswith("```"):
+        text_clean = text_clean[3:-3].strip()
+    return text_clean
+
+
+def _parse_url_response(text_content: str) -> Dict[str, Any]:
+    """Convierte la respuesta textual de Gemini para una URL en un veredicto."""
+    # Intentar parsear JSON
+    try:
+        data = json.loads(_strip_code_fences(text_content))
         
-        try:
-            response_data = resp.json()
-            text_content = _parse_gemini_response(response_data)
-        except:
-            text_content = resp.text
+        verdict = data.get("verdict", "Desconocido")
+        # Normalizar veredicto
+        verdict_lower = verdict.lower()
+        if "maliciosa" in verdict_lower or "malicious" in verdict_lower:
+            verdict = "Maliciosa"
+        elif "sospechosa" in verdict_lower or "suspicious" in verdict_lower:
+            verdict = "Sospechosa"
+        elif "segura" in verdict_lower or "safe" in verdict_lower:
+            verdict = "Segura"
         
-        # Intentar parsear JSON
-        try:
-            # Limpiar markdown
-            text_clean = text_content.strip()
-            if "```json" in text_clean:
-                start = text_clean.find("```json") + 7
-                end = text_clean.find("```", start)
-                if end > start:
-                    text_clean = text_clean[start:end].strip()
-            elif text_clean.startswith("```") and text_clean.endswith("```"):
-                text_clean = text_clean[3:-3].strip()
-            
-            data = json.loads(text_clean)
-            
-            verdict = data.get("verdict", "Desconocido")
-            # Normalizar veredicto
-            verdict_lower = verdict.lower()
-            if "maliciosa" in verdict_lower or "malicious" in verdict_lower:
-                verdict = "Maliciosa"
-            elif "sospechosa" in verdict_lower or "suspicious" in verdict_lower:
-                verdict = "Sospechosa"
-            elif "segura" in verdict_lower or "safe" in verdict_lower:
-                verdict = "Segura"
-            
-            return {
-                "verdict": verdict,
-                "reason": data.get("reason", "Sin detalles"),
-                "score": int(data.get("score", 0)),
-                "raw": data
-            }
-        except (json.JSONDecodeError, ValueError):
-            # Análisis heurístico del texto
-            text_lower = text_content.lower()
-            if "maliciosa" in text_lower or "malicious" in text_lower:
-                verdict = "Maliciosa"
-            elif "sospechosa" in text_lower or "suspicious" in text_lower:
-                verdict = "Sospechosa"
-            else:
-                verdict = "Segura"
-            
-            return {
-                "verdict": verdict,
-                "reason": text_content[:200],
-                "score": 50,
-                "raw": text_content
-            }
-            
-    except Exception as e:
-        logger.error(f"Error in analyze_url: {e}")
-        raise
\ No newline at end of file
+        return {
+            "verdict": verdict,
+            "reason": data.get("reason", "Sin detalles"),
+            "score": int(data.get("score", 0)),
+            "raw": data
+        }
+    except (json.JSONDecodeError, ValueError):
+        # Análisis heurístico del texto
+        text_lower = text_content.lower()
+        if "maliciosa" in text_lower or "malicious" in text_lower:
+            verdict = "Maliciosa"
+        elif "sospechosa" in text_lower or "suspicious" in text_lower:
+            verdict = "Sospechosa"
+        else:
+            verdict = "Segura"
+        
+        return {
+            "verdict": verdict,
+            "reason": text_content[:200],
+            "score": 50,
+            "raw": text_content
+        }
+
+
+# ============================================
+# MICRO-BATCHING
+# ============================================
+
+def _build_batch_prompt(items: list) -> str:
+    """Prompt con varios textos/URLs; cada uno se identifica por su índice."""
+    parts = []
+    for i, item in enumerate(items):
+        if item["kind"] == "url":
+            parts.append(f"[id={i}] URL: {item['content']}")
+        else:
+            parts.append(f"[id={i}] TEXTO:\n{item['content']}")
+    return (
+        "Eres un experto en ciberseguridad especializado en detectar phishing. "
+        "Analiza DE FORMA INDEPENDIENTE cada uno de los siguientes elementos (textos o URLs).\n\n"
+        "IMPORTANTE: Responde ÚNICAMENTE con un array JSON válido (sin markdown) con un objeto por elemento:\n"
+        "- Para TEXTO: "
+        '{"id": <id>, "verdict": "Seguro" o "Sospechoso" o "Phishing", '
+        '"percentage": número entre 0 y 100, "reasons": ["razón 1", "..."]}\n'
+        "- Para URL: "
+        '{"id": <id>, "verdict": "Segura" o "Sospechosa" o "Maliciosa", '
+        '"reason": "explicación breve", "score": número entre 0 y 100}\n\n'
+        "ELEMENTOS:\n\n" + "\n\n".join(parts) + "\n\n"
+        "Responde solo con el array JSON:"
+    )
+
+
+def _split_batch_response(text_content: str) -> Dict[int, dict]:
+    """Devuelve {id: objeto} con los elementos bien formados de la respuesta."""
+    try:
+        data = json.loads(_strip_code_fences(text_content))
+    except (json.JSONDecodeError, ValueError):
+        return {}
+    if isinstance(data, dict):
+        data = data.get("items", [])
+    if not isinstance(data, list):
+        return {}
+
+    by_id = {}
+    for obj in data:
+        if isinstance(obj, dict) and "verdict" in obj:
+            try:
+                by_id[int(obj.get("id"))] = obj
+            except (TypeError, ValueError):
+                continue
+    return by_id
+
+
+async def _analyze_batch(group: tuple, items: list) -> list:
+    """
+    Handler del MicroBatcher: una sola llamada a Gemini para todo el lote.
+    Los elementos que no vengan (o no se puedan parsear) en la respuesta
+    conjunta se reintentan por la vía individual. El timeout forma parte del
+    grupo; los max_tokens de cada elemento se suman para la llamada conjunta.
+    """
+    gemini_key, gemini_url, timeout = group
+
+    async def single(item: dict):
+        if item["kind"] == "url":
+            return await _analyze_url_single(item["content"], gemini_key, gemini_url,
+                                             item["max_tokens"], timeout)
+        return await _analyze_text_single(item["content"], gemini_key, gemini_url,
+                                          item["max_tokens"], timeout)
+
+    if len(items) == 1:
+        return [await single(items[0])]
+
+    max_tokens = sum(item["max_tokens"] for item in items)
+    resp = await _post_to_gemini(_build_batch_prompt(items), gemini_key, gemini_url, max_tokens, timeout)
+    try:
+        text_content = _parse_gemini_response(resp.json())
+    except Exception:
+        text_content = resp.text
+    by_id = _split_batch_response(text_content)
+    logger.info(f"Lote Gemini: {len(items)} elementos, {len(by_id)} parseados")
+
+    results: list = [None] * len(items)
+    fallback = []
+    for i, item in enumerate(items):
+        obj = by_id.get(i)
+        if obj is None:
+            fallback.append(i)
+        elif item["kind"] == "url":
+            results[i] = _parse_url_response(json.dumps(obj))
+        else:
+            results[i] = _parse_provider_text_response(json.dumps(obj))
+
+    if fallback:
+        logger.warning(f"Lote Gemini: {len(fallback)} elementos sin respuesta válida, vía individual")
+        retried = await asyncio.gather(*(single(items[i]) for i in fallback), return_exceptions=True)
+        for i, res in zip(fallback, retried):
+            results[i] = res
+
+    return results
+
+
+gemini_batcher = MicroBatcher(
+    _analyze_batch,
+    window_ms=settings.GEMINI_BATCH_WINDOW_MS,
+    max_items=settings.GEMINI_BATCH_MAX_ITEMS,
+)
@@ -0,0 +1,58 @@
+# app/services/http_clients.py
+import logging
+import httpx
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Un cliente por proveedor: reutiliza conexiones (keep-alive) y evita un
+# handshake TCP+TLS en cada análisis. Se crean en el startup de la app.
+_clients: dict[str, httpx.AsyncClient] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 en httpx requiere el paquete opcional 'h2'."""
+    if not settings.HTTP_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _build_client(timeout: float) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(timeout=timeout, limits=limits, http2=_http2_available())
+
+
+def init_http_clients() -> None:
+    """Crea los clientes compartidos (idempotente)."""
+    if "gemini" not in _clients:
+        _clients["gemini"] = _build_client(settings.GEMINI_TIMEOUT)
+    if "safe_browsing" not in _clients:
+        _clients["safe_browsing"] = _build_client(settings.SAFE_BROWSING_TIMEOUT)
+    logger.info(f"Clientes HTTP inicializados (http2={_http2_available()})")
+
+
+async def close_http_clients() -> None:
+    """Cierra los clientes compartidos y libera sus conexiones."""
+    for name in list(_clients):
+        client = _clients.pop(name)
+        await client.aclose()
+
+
+def get_gemini_client() -> httpx.AsyncClient:
+    if "gemini" not in _clients:
+        init_http_clients()
+    return _clients["gemini"]
+
+
+def get_safe_browsing_client() -> httpx.AsyncClient:
+    if "safe_browsing" not in _clients:
+        init_http_clients()
+    return _clients["safe_browsing"]
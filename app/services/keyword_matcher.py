@@ -0,0 +1,105 @@
+# app/services/keyword_matcher.py
+"""
+Búsqueda de muchas palabras clave en una sola pasada.
+
+Se construye una vez a partir de varias listas con nombre; `match` recorre el
+texto (en minúsculas) una sola vez y devuelve, por lista, cuántas palabras
+distintas aparecen y en qué posiciones.
+
+Con listas pequeñas (las de scoring.py) cada palabra se busca con str.find
+sobre el texto ya en minúsculas: son recorridos en C y, con pocas palabras,
+más rápidos que cualquier recorrido carácter a carácter en Python (y que una
+regex con alternancia, que prueba todas las palabras en cada posición). A
+partir de AUTOMATON_MIN_WORDS palabras se usa un autómata Aho-Corasick, cuyo
+coste no depende del tamaño de las listas.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+AUTOMATON_MIN_WORDS = 500
+
+
+class KeywordMatcher:
+    def __init__(self, lists: Dict[str, Iterable[str]]):
+        self.list_names = list(lists)
+        # palabra -> listas en las que aparece
+        self._lists_of: Dict[str, List[str]] = {}
+        for name, words in lists.items():
+            for word in words:
+                if word and name not in self._lists_of.setdefault(word, []):
+                    self._lists_of[word].append(name)
+
+        self._use_automaton = len(self._lists_of) >= AUTOMATON_MIN_WORDS
+        if not self._use_automaton:
+            return
+        # Nodo i: transiciones, enlace de fallo y salidas (lista, palabra)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, str]]] = [[]]
+        for word, names in self._lists_of.items():
+            for name in names:
+                self._add(name, word)
+        self._build_failure_links()
+
+    def _add(self, name: str, word: str) -> None:
+        node = 0
+        for ch in word:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        if (name, word) not in self._out[node]:
+            self._out[node].append((name, word))
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                # Las palabras que son sufijo de esta también terminan aquí
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def match(self, text: str) -> Dict[str, Dict]:
+        """
+        {lista: {"count": palabras distintas encontradas,
+                 "matches": {palabra: [posiciones de inicio en text.lower()]}}}
+        para todas las listas (también las que no tienen coincidencias).
+        """
+        hits: Dict[str, Dict[str, List[int]]] = {name: {} for name in self.list_names}
+        if self._use_automaton:
+            self._match_automaton(text.lower(), hits)
+        else:
+            self._match_find(text.lower(), hits)
+        return {name: {"count": len(found), "matches": found} for name, found in hits.items()}
+
+    def _match_find(self, text: str, hits: Dict[str, Dict[str, List[int]]]) -> None:
+        for word, names in self._lists_of.items():
+            pos = text.find(word)
+            if pos == -1:
+                continue
+            found = []
+            while pos != -1:
+                found.append(pos)
+                pos = text.find(word, pos + 1)
+            for k, name in enumerate(names):
+                hits[name][word] = found if k == 0 else list(found)
+
+    def _match_automaton(self, text: str, hits: Dict[str, Dict[str, List[int]]]) -> None:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for name, word in out[node]:
+                hits[name].setdefault(word, []).append(i - len(word) + 1)
@@ -2,6 +2,8 @@
 import httpx
 import logging
 from ..core.config import settings
+from .http_clients import get_safe_browsing_client
+from .circuit_breaker import safe_browsing_breaker, CircuitOpenError
 
 logger = logging.getLogger(__name__)
 
@@ -35,58 +37,71 @@ async def check_url_google_safe_browsing(url: str) -> dict:
     
     logger.info(f"Consultando Google Safe Browsing para: {url}")
     
-    async with httpx.AsyncClient(timeout=8.0) as client:
-        try:
-            r = await client.post(endpoint, json=payload)
-            
-            if r.status_code != 200:
-                logger.error(f"Google Safe Browsing error {r.status_code}: {r.text}")
-                return {
-                    "verdict": "Desconocido",
-                    "reason": f"Error de API (código {r.status_code})",
-                    "raw": r.text
-                }
-            
-            data = r.json()
-            logger.debug(f"Respuesta de Safe Browsing: {data}")
-            
-            # Si no hay matches, la URL no está en la lista negra
-            if not data or "matches" not in data or not data["matches"]:
-                logger.info(f"URL no encontrada en listas negras de Google: {url}")
-                return {
-                    "verdict": "Segura",
-                    "reason": "No encontrada en listas negras de Google (NOTA: esto NO garantiza que sea segura)",
-                    "raw": data
-                }
-            
-            # Si hay matches, es una amenaza conocida
-            reasons = []
-            for m in data.get("matches", []):
-                threat_type = m.get("threatType", "UNKNOWN")
-                platform = m.get("platformType", "")
-                entry_type = m.get("threatEntryType", "")
-                reasons.append(f"{threat_type} en {platform}")
-            
-            reason_text = ", ".join(reasons)
-            logger.warning(f"⚠️ URL MALICIOSA detectada por Google: {url} - {reason_text}")
-            
-            return {
-                "verdict": "Maliciosa",
-                "reason": f"⚠️ Reportada por Google Safe Browsing: {reason_text}",
-                "raw": data
-            }
-            
-        except httpx.TimeoutException:
-            logger.error(f"Timeout consultando Google Safe Browsing para {url}")
+    client = get_safe_browsing_client()
+    try:
+        async with safe_browsing_breaker.guard() as guard:
+            r = await client.post(
+                endpoint, json=payload,
+                timeout=safe_browsing_breaker.adaptive_timeout(settings.SAFE_BROWSING_TIMEOUT)
+            )
+            if r.status_code >= 500 or r.status_code == 429:
+                guard.mark_failure()
+        
+        if r.status_code != 200:
+            logger.error(f"Google Safe Browsing error {r.status_code}: {r.text}")
             return {
                 "verdict": "Desconocido",
-                "reason": "Timeout de conexión",
-                "raw": None
+                "reason": f"Error de API (código {r.status_code})",
+                "raw": r.text
             }
-        except Exception as e:
-            logger.error(f"Error consultando Google Safe Browsing: {e}")
+        
+        data = r.json()
+        logger.debug(f"Respuesta de Safe Browsing: {data}")
+        
+        # Si no hay matches, la URL no está en la lista negra
+        if not data or "matches" not in data or not data["matches"]:
+            logger.info(f"URL no encontrada en listas negras de Google: {url}")
             return {
-                "verdict": "Desconocido",
-                "reason": f"Error: {str(e)}",
-                "raw": None
-            }
\ No newline at end of file
+                "verdict": "Segura",
+                "reason": "No encontrada en listas negras de Google (NOTA: esto NO garantiza que sea segura)",
+                "raw": data
+            }
+        
+        # Si hay matches, es una amenaza conocida
+        reasons = []
+        for m in data.get("matches", []):
+            threat_type = m.get("threatType", "UNKNOWN")
+            platform = m.get("platformType", "")
+            entry_type = m.get("threatEntryType", "")
+            reasons.append(f"{threat_type} en {platform}")
+        
+        reason_text = ", ".join(reasons)
+        logger.warning(f"⚠️ URL MALICIOSA detectada por Google: {url} - {reason_text}")
+        
+        return {
+            "verdict": "Maliciosa",
+            "reason": f"⚠️ Reportada por Google Safe Browsing: {reason_text}",
+            "raw": data
+        }
+        
+    except CircuitOpenError:
+        logger.warning(f"Circuito abierto para Google Safe Browsing, se omite {url}")
+        return {
+            "verdict": "Desconocido",
+            "reason": "Proveedor no disponible temporalmente (circuito abierto)",
+            "raw": None
+        }
+    except httpx.TimeoutException:
+        logger.error(f"Timeout consultando Google Safe Browsing para {url}")
+        return {
+            "verdict": "Desconocido",
+            "reason": "Timeout de conexión",
+            "raw": None
+        }
+    except Exception as e:
+        logger.error(f"Error consultando Google Safe Browsing: {e}")
+        return {
+            "verdict": "Desconocido",
+            "reason": f"Error: {str(e)}",
+            "raw": None
+        }
\ No newline at end of file
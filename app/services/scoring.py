@@ -1,25 +1,155 @@
 # app/services/scoring.py
 import re
-from typing import List, Dict, Any
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List
 from urllib.parse import urlparse
 
+from ..core.config import settings
+from .blocklist import blocklist
+from .brand_index import HIGH_RISK_TLDS, brand_index
+from .keyword_matcher import KeywordMatcher
+
+# Listas de palabras clave; los autómatas se construyen una sola vez al importar
+TEXT_KEYWORDS_HIGH = [
+    "transferir", "verifique", "verificar", "bloqueada", "urgente",
+    "inmediatamente", "confirmar", "credenciales", "contraseña", "pago"
+]
+TEXT_KEYWORDS_MEDIUM = [
+    "problema", "alerta", "suscrito", "ganó", "felicitaciones"
+]
+URL_PHISHING_KEYWORDS = [
+    "login", "signin", "account", "verify", "secure", "update",
+    "confirm", "banking", "paypal", "amazon", "microsoft", "apple",
+    "password", "suspend", "locked", "security", "validation"
+]
+
+_text_matcher = KeywordMatcher({"high": TEXT_KEYWORDS_HIGH, "medium": TEXT_KEYWORDS_MEDIUM})
+_url_matcher = KeywordMatcher({"phishing": URL_PHISHING_KEYWORDS})
+
+
+def _found(hits: Dict[str, Any]) -> str:
+    """Palabras encontradas en orden de aparición, para las razones."""
+    return ", ".join(sorted(hits["matches"], key=lambda w: hits["matches"][w][0]))
+
 def extract_urls(text: str) -> List[str]:
     pattern = r"https?://[\w\-\.\/~:?&=#%+\[\]]+"
     return re.findall(pattern, text)
 
+# Memo LRU de score_url: url -> resultado. La clave es la URL tal cual: las
+# heurísticas dependen de la forma exacta (longitud, mayúsculas del esquema,
+# codificación), así que normalizarla cambiaría el resultado de algunas variantes.
+_url_memo: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_url_memo_lock = threading.Lock()
+_url_memo_counters = {"hits": 0, "misses": 0}
+
+
 def score_url(url: str) -> Dict[str, Any]:
+    """score_url con memo LRU acotado (URL_SCORE_MEMO_MAX); devuelve una copia."""
+    with _url_memo_lock:
+        cached = _url_memo.get(url)
+        if cached is not None:
+            _url_memo.move_to_end(url)
+            _url_memo_counters["hits"] += 1
+            return dict(cached)
+        _url_memo_counters["misses"] += 1
+    result = _score_url(url)
+    if settings.URL_SCORE_MEMO_MAX > 0:
+        with _url_memo_lock:
+            _url_memo[url] = result
+            _url_memo.move_to_end(url)
+            while len(_url_memo) > settings.URL_SCORE_MEMO_MAX:
+                _url_memo.popitem(last=False)
+    return dict(result)
+
+
+def url_memo_stats() -> Dict[str, Any]:
+    with _url_memo_lock:
+        hits, misses = _url_memo_counters["hits"], _url_memo_counters["misses"]
+        size = len(_url_memo)
+    lookups = hits + misses
+    return {
+        "size": size,
+        "max_size": settings.URL_SCORE_MEMO_MAX,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+    }
+
+
+class _UrlFacts:
+    """Datos de una URL que usan las comprobaciones, calculados una sola vez."""
+
+    __slots__ = ("url", "domain", "scheme", "port", "dots", "hyphens", "keyword_hits", "brand_match")
+
+    def __init__(self, url: str, parsed):
+        self.url = url
+        self.domain = parsed.netloc.lower()
+        self.scheme = parsed.scheme
+        self.port = parsed.port  # ValueError si el puerto no es válido
+        self.dots = self.domain.count(".")
+        self.hyphens = self.domain.count("-")
+        self.keyword_hits = _url_matcher.match(url)["phishing"]
+        self.brand_match = brand_index.lookup(self.domain)
+
+
+_IP_HOST_RE = re.compile(r"https?://(?:\d{1,3}\.){3}\d{1,3}")
+_SUSPICIOUS_CHARS_RE = re.compile(r"[<>@]")
+_DIGITS_RE = re.compile(r"\d")
+
+# Heurísticas de URL: (condición, puntos, razón). La razón es un texto, una
+# función de los datos de la URL o None si la señal suma sin mencionarse. Los
+# tramos (longitud, subdominios, guiones, palabras clave) son filas excluyentes.
+# _score_url y score_urls leen esta misma tabla.
+URL_CHECKS = (
+    # Dirección IP en lugar de dominio (muy sospechoso)
+    (lambda f: _IP_HOST_RE.search(f.url), 35, "⚠️ Uso de dirección IP en lugar de dominio"),
+    # URL larga (a menudo usada para ocultar el destino real)
+    (lambda f: len(f.url) > 100, 20, "URL excesivamente larga"),
+    (lambda f: 75 < len(f.url) <= 100, 10, "URL muy larga"),
+    # Muchos subdominios (ej: secure.login.paypal.fake-site.com)
+    (lambda f: f.dots > 3, 25, lambda f: f"Demasiados subdominios ({f.dots})"),
+    (lambda f: f.dots == 3, 10, None),
+    # Uso excesivo de guiones (técnica común de phishing)
+    (lambda f: f.hyphens > 3, 20, "Uso excesivo de guiones en el dominio"),
+    (lambda f: 1 < f.hyphens <= 3, 5, None),
+    (lambda f: _SUSPICIOUS_CHARS_RE.search(f.url), 15, "Caracteres sospechosos en la URL"),
+    (lambda f: f.domain.endswith(HIGH_RISK_TLDS), 25, "TLD de alto riesgo (gratuito/spam)"),
+    # Palabras clave de phishing en el dominio o path
+    (lambda f: f.keyword_hits["count"] >= 3, 30,
+     lambda f: f"Múltiples palabras clave de phishing ({f.keyword_hits['count']}: {_found(f.keyword_hits)})"),
+    (lambda f: f.keyword_hits["count"] == 2, 20,
+     lambda f: f"Palabras clave de phishing detectadas ({_found(f.keyword_hits)})"),
+    (lambda f: f.keyword_hits["count"] == 1, 10, None),
+    # Dominios que imitan marcas conocidas (homóglifos, erratas, marca incrustada)
+    (lambda f: f.brand_match, 40,
+     lambda f: f"⚠️ Posible imitación de marca conocida ({f.brand_match['brand']}: {f.brand_match['label']})"),
+    (lambda f: f.port and f.port not in (80, 443), 15, lambda f: f"Puerto no estándar ({f.port})"),
+    # @ en la URL (puede ocultar el dominio real)
+    (lambda f: "@" in f.url, 35, "⚠️ Carácter @ detectado (técnica de ocultación)"),
+    # Números en el dominio (sospechoso para marcas legítimas)
+    (lambda f: _DIGITS_RE.search(f.domain), 8, "Números en el dominio"),
+    # Codificación hexadecimal o URL encoding sospechosa
+    (lambda f: f.url.count("%") > 3, 15, "Codificación de URL sospechosa"),
+    (lambda f: f.scheme == "http", 10, "No usa HTTPS"),
+)
+
+
+def _url_verdict(score: int) -> str:
+    if score > 60:
+        return "Maliciosa"
+    if score > 30:
+        return "Sospechosa"
+    return "Segura"
+
+
+def _score_url(url: str) -> Dict[str, Any]:
     """
     Analiza una URL con heurísticas mejoradas para detectar phishing.
     Retorna score, verdict y razones detalladas.
     """
-    score = 0
-    reasons = []
-    
     try:
         parsed = urlparse(url)
-        domain = parsed.netloc.lower()
-        path = parsed.path.lower()
-        full_url_lower = url.lower()
     except Exception:
         return {
             "url": url,
@@ -27,142 +157,97 @@ def score_url(url: str) -> Dict[str, Any]:
             "verdict": "Sospechosa",
             "reason": "URL mal formada o inválida"
         }
-    
-    # 1. Uso de dirección IP en lugar de dominio (muy sospechoso)
-    if re.search(r"https?://(?:\d{1,3}\.){3}\d{1,3}", url):
-        score += 35
-        reasons.append("⚠️ Uso de dirección IP en lugar de dominio")
-    
-    # 2. URL extremadamente larga (a menudo usada para ocultar el destino real)
-    if len(url) > 100:
-        score += 20
-        reasons.append("URL excesivamente larga")
-    elif len(url) > 75:
-        score += 10
-        reasons.append("URL muy larga")
-    
-    # 3. Muchos subdominios (ej: secure.login.paypal.fake-site.com)
-    subdomain_count = domain.count('.')
-    if subdomain_count > 3:
-        score += 25
-        reasons.append(f"Demasiados subdominios ({subdomain_count})")
-    elif subdomain_count > 2:
-        score += 10
-    
-    # 4. Uso excesivo de guiones (técnica común de phishing)
-    if domain.count("-") > 3:
-        score += 20
-        reasons.append("Uso excesivo de guiones en el dominio")
-    elif domain.count("-") > 1:
-        score += 5
-    
-    # 5. Caracteres sospechosos
-    if re.search(r"[<>@]", url):
-        score += 15
-        reasons.append("Caracteres sospechosos en la URL")
-    
-    # 6. TLDs de alto riesgo
-    high_risk_tlds = [".tk", ".ml", ".ga", ".cf", ".gq", ".xyz", ".top", ".club", ".work"]
-    if any(domain.endswith(t) for t in high_risk_tlds):
-        score += 25
-        reasons.append("TLD de alto riesgo (gratuito/spam)")
-    
-    # 7. Palabras clave de phishing en el dominio o path
-    phishing_keywords = [
-        "login", "signin", "account", "verify", "secure", "update", 
-        "confirm", "banking", "paypal", "amazon", "microsoft", "apple",
-        "password", "suspend", "locked", "security", "validation"
-    ]
-    keyword_count = sum(1 for kw in phishing_keywords if kw in full_url_lower)
-    if keyword_count >= 3:
-        score += 30
-        reasons.append(f"Múltiples palabras clave de phishing ({keyword_count})")
-    elif keyword_count >= 2:
-        score += 20
-        reasons.append("Palabras clave de phishing detectadas")
-    elif keyword_count == 1:
-        score += 10
-    
-    # 8. Dominios que imitan marcas conocidas
-    brand_impersonation = [
-        "paypa1", "paypa-", "paypai", "amaz0n", "amazom", "micros0ft", 
-        "g00gle", "gooogle", "appleid", "netfIix", "whatsap"
-    ]
-    if any(brand in domain for brand in brand_impersonation):
-        score += 40
-        reasons.append("⚠️ Posible imitación de marca conocida")
-    
-    # 9. Puerto no estándar
-    if parsed.port and parsed.port not in [80, 443]:
-        score += 15
-        reasons.append(f"Puerto no estándar ({parsed.port})")
-    
-    # 10. Uso de @ en la URL (puede ocultar el dominio real)
-    if "@" in url:
-        score += 35
-        reasons.append("⚠️ Carácter @ detectado (técnica de ocultación)")
-    
-    # 11. Números en el dominio (sospechoso para marcas legítimas)
-    if re.search(r"\d+", domain):
-        score += 8
-        reasons.append("Números en el dominio")
-    
-    # 12. Codificación hexadecimal o URL encoding sospechosa
-    if "%" in url and url.count("%") > 3:
-        score += 15
-        reasons.append("Codificación de URL sospechosa")
-    
-    # 13. HTTPS pero dominio sospechoso
-    if parsed.scheme == "http":
-        score += 10
-        reasons.append("No usa HTTPS")
-    
-    # Normalizar score
+    facts = _UrlFacts(url, parsed)
+
+    score = 0
+    reasons = []
+    for check, points, reason in URL_CHECKS:
+        if check(facts):
+            score += points
+            if reason:
+                reasons.append(reason(facts) if callable(reason) else reason)
+
     score = max(0, min(100, score))
-    
-    # Determinar veredicto
-    if score > 60:
-        verdict = "Maliciosa"
-    elif score > 30:
-        verdict = "Sospechosa"
-    else:
-        verdict = "Segura"
-    
     reason = "; ".join(reasons) if reasons else "No se detectaron señales de phishing obvias"
-    
+
     return {
         "url": url,
         "score": score,
-        "verdict": verdict,
-        "reason": reason
+        "verdict": _url_verdict(score),
+        "reason": reason,
+        "keyword_hits": {"phishing": facts.keyword_hits},
+        "brand_match": facts.brand_match,
     }
 
 
+# --- Puntuación por lotes -------------------------------------------------
+
+def _url_points(url: str) -> int | None:
+    """Score de _score_url sin construir razones; None si no se puede parsear."""
+    try:
+        facts = _UrlFacts(url, urlparse(url))
+    except Exception:
+        return None
+    return max(0, min(100, sum(points for check, points, _ in URL_CHECKS if check(facts))))
+
+
+def score_urls(batch: Iterable[str]) -> List[Dict[str, Any]]:
+    """
+    Versión por lotes de score_url: mismo score y veredicto, sin 'reason' y
+    sin pasar por el memo. Una URL cuyo puerto no se puede parsear (con la que
+    score_url lanza ValueError) puntúa 50, para que una línea mala no aborte
+    el lote. Pensada para logs de proxy y similares; para mostrar razones al
+    usuario, usar score_url.
+    """
+    results = []
+    for url in batch:
+        score = _url_points(url)
+        if score is None:
+            score = 50
+        results.append({"url": url, "score": score, "verdict": _url_verdict(score)})
+    return results
+
+
 def score_text(text: str) -> Dict[str, Any]:
     """Analiza texto buscando indicadores de phishing."""
     score = 0
     reasons = []
     
-    keywords_high = [
-        "transferir", "verifique", "verificar", "bloqueada", "urgente",
-        "inmediatamente", "confirmar", "credenciales", "contraseña", "pago"
-    ]
-    keywords_medium = [
-        "problema", "alerta", "suscrito", "ganó", "felicitaciones"
-    ]
-
-    low_count = sum(1 for w in keywords_medium if w in text.lower())
-    mid_count = sum(1 for w in keywords_high if w in text.lower())
+    # Una sola pasada para todas las listas
+    keyword_hits = _text_matcher.match(text)
+    mid_count = keyword_hits["high"]["count"]
+    low_count = keyword_hits["medium"]["count"]
     
     score += mid_count * 18
     score += low_count * 8
+    if mid_count:
+        reasons.append(f"Lenguaje de urgencia o de petición de datos: {_found(keyword_hits['high'])}")
+    if low_count:
+        reasons.append(f"Palabras habituales en fraudes: {_found(keyword_hits['medium'])}")
 
-    urls = extract_urls(text)
-    if urls:
-        for u in urls:
-            url_info = score_url(u)
+    # Cada URL distinta se puntúa una vez; las repetidas (enlaces de seguimiento
+    # de envíos masivos) siguen sumando por aparición, pero con una sola razón
+    url_counts = Counter(extract_urls(text))
+    urls = list(url_counts)
+    url_results = [score_url(u) for u in urls]
+    blocklisted = False
+    for u, url_info in zip(urls, url_results):
+        for _ in range(url_counts[u]):
             score += url_info["score"] * 0.6
-            reasons.append(f"URL detectada: {u} ({url_info['verdict']})")
+        times = f" ×{url_counts[u]}" if url_counts[u] > 1 else ""
+        # Lista de bloqueo local: aquí no hay votación de proveedores como en
+        # /analyze_url, así que un enlace listado decide el veredicto del texto
+        match = blocklist.check_url(u)
+        if match:
+            blocklisted = True
+            url_info.update({
+                "verdict": "Maliciosa",
+                "reason": f"⛔ En la lista de bloqueo local ({match['entry']}); {url_info['reason']}",
+                "blocklist_match": match,
+            })
+            reasons.append(f"⛔ URL en la lista de bloqueo local: {u}{times} ({match['entry']})")
+        else:
+            reasons.append(f"URL detectada: {u}{times} ({url_info['verdict']})")
 
     if re.search(r"[A-Z]{5,}", text):
         score += 8
@@ -172,12 +257,13 @@ def score_text(text: str) -> Dict[str, Any]:
         score += 6
         reasons.append("Uso excesivo de signos de exclamación")
 
-    score = int(max(0, min(100, score)))
+    score = 100 if blocklisted else int(max(0, min(100, score)))
     verdict = "Phishing" if score > 66 else "Sospechoso" if score > 33 else "Seguro"
     
     return {
         "percentage": score,
         "verdict": verdict,
         "reasons": reasons,
-        "url_results": [score_url(u) for u in urls]
+        "url_results": url_results,
+        "keyword_hits": keyword_hits,
     }
\ No newline at end of file
@@ -0,0 +1,55 @@
+# app/services/singleflight.py
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """
+    Deduplica llamadas concurrentes: mientras hay una llamada en vuelo para
+    una clave, el resto de peticiones con esa clave esperan a la misma tarea
+    y comparten su resultado (o su excepción).
+
+    Si todos los que esperan se cancelan, la tarea compartida también se cancela.
+    """
+
+    def __init__(self):
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self._waiters: dict[Hashable, int] = {}
+        self.counters = {"calls": 0, "shared": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.counters["calls"] += 1
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            self.counters["shared"] += 1
+            logger.debug(f"Single-flight: reutilizando llamada en vuelo para {key!r}")
+
+        self._waiters[key] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError as e:
+            if not task.done() and self._waiters.get(key) == 1:
+                task.cancel(*e.args)  # conserva el motivo (ver circuit_breaker)
+            raise
+        finally:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._waiters[key]
+
+    def stats(self) -> dict:
+        return {**self.counters, "inflight": len(self._inflight)}
+
+
+provider_flights = SingleFlight()
@@ -0,0 +1,126 @@
+# app/services/verdict_cache.py
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from ..core.config import settings
+from ..db.repository import get_llm_cache_db, put_llm_cache_db, prune_llm_cache_db
+from ..db.executor import run_db
+
+logger = logging.getLogger(__name__)
+
+# Cada cuántas escrituras se purga la tabla persistente (TTL + tamaño)
+_PRUNE_EVERY = 100
+
+
+def normalize_content(kind: str, content: str) -> str:
+    """
+    Normaliza la entrada para que variaciones triviales compartan entrada de caché:
+    espacios colapsados y, en URLs, esquema y dominio en minúsculas.
+    """
+    content = re.sub(r"\s+", " ", content or "").strip()
+    if kind == "url":
+        m = re.match(r"^([a-zA-Z][a-zA-Z0-9+.\-]*://[^/?#]*)(.*)$", content)
+        if m:
+            content = m.group(1).lower() + m.group(2)
+    return content
+
+
+def cache_key(kind: str, content: str, prompt_version: str, model: str = "") -> str:
+    """Hash del contenido normalizado + versión del prompt + modelo."""
+    raw = "\x1f".join([kind, prompt_version, model, normalize_content(kind, content)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class VerdictCache:
+    """
+    Caché de veredictos del LLM en dos niveles:
+      1) LRU en memoria (OrderedDict) con TTL
+      2) Tabla 'llm_cache' en SQLite con TTL y límite de filas
+    """
+
+    def __init__(self, max_items: int, ttl_seconds: float, db_max_rows: int):
+        self.max_items = max_items
+        self.ttl_seconds = ttl_seconds
+        self.db_max_rows = db_max_rows
+        self._items: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires_at, value = item
+                if expires_at > now:
+                    self._items.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return value
+                del self._items[key]
+
+        try:
+            row = await run_db(get_llm_cache_db, key, now)
+        except Exception as e:
+            logger.warning(f"Error leyendo caché persistente: {e}")
+            row = None
+        if row is not None:
+            value = json.loads(row["value"])
+            self._remember(key, row["expires_at"], value)
+            with self._lock:
+                self.counters["db_hits"] += 1
+            return value
+
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    async def put(self, key: str, kind: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        expires_at = now + self.ttl_seconds
+        self._remember(key, expires_at, value)
+        with self._lock:
+            self.counters["stores"] += 1
+            prune = self.counters["stores"] % _PRUNE_EVERY == 0
+        try:
+            await run_db(put_llm_cache_db, key, kind, json.dumps(value, ensure_ascii=False), now, expires_at)
+            if prune:
+                removed = await run_db(prune_llm_cache_db, now, self.db_max_rows)
+                with self._lock:
+                    self.counters["evictions"] += removed
+        except Exception as e:
+            logger.warning(f"Error guardando en caché persistente: {e}")
+
+    def _remember(self, key: str, expires_at: float, value: Dict[str, Any]) -> None:
+        with self._lock:
+            self._items[key] = (expires_at, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["db_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "size": len(self._items),
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+verdict_cache = VerdictCache(
+    max_items=settings.LLM_CACHE_MEMORY_ITEMS,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    db_max_rows=settings.LLM_CACHE_DB_MAX_ROWS,
+)
@@ -184,11 +184,20 @@ async function loadUserData() {
   }
 }
 
-async function fetchHistory() {
+// Historial paginado por cursor: se pide la primera página y el resto bajo demanda
+const HISTORY_PAGE_SIZE = 50;
+let historyItems = [];
+let historyCursor = null;
+let historyTotal = null;  // solo lo devuelve la primera página
+
+async function fetchHistory(append = false) {
   const token = localStorage.getItem('phishguard_token');
   if (!token) return;
 
-  const res = await fetch(`${API}/history`, {
+  const params = new URLSearchParams({ limit: HISTORY_PAGE_SIZE });
+  if (append && historyCursor !== null) params.set('cursor', historyCursor);
+
+  const res = await fetch(`${API}/history?${params}`, {
     headers: { 'Authorization': `Bearer ${token}` }
   });
 
@@ -197,20 +206,25 @@ async function fetchHistory() {
     throw new Error('Error fetching history');
   }
 
-  const history = await res.json();
-  renderHistory(history);
+  const page = await res.json();
+  historyItems = append ? historyItems.concat(page.items) : page.items;
+  historyCursor = page.next_cursor;
+  if (!append) historyTotal = page.total;
+  renderHistory(historyItems, historyTotal);
 }
 
-function renderHistory(history) {
+function renderHistory(history, total = null) {
   const list = document.getElementById('historyList');
   if (!list) return;
 
   if (!history || history.length === 0) {
+    historyItems = [];
+    historyCursor = null;
     list.innerHTML = '<li style="padding:10px; text-align:center; color:var(--text-muted);">Sin historial</li>';
     return;
   }
 
-  list.innerHTML = history.slice().reverse().map(h => {
+  list.innerHTML = history.map(h => {
     const type = h.type === 'texto' ? '📝' : '🔗';
     const verdictClass = h.verdict === 'Maliciosa' || h.verdict === 'Phishing' ? 'color:var(--danger)' : 
                          h.verdict === 'Segura' ? 'color:var(--success)' : 'color:var(--warning)';
@@ -227,6 +241,18 @@ function renderHistory(history) {
       </li>
     `;
   }).join('');
+
+  if (historyCursor !== null) {
+    const remaining = total !== null ? ` (${total - history.length} más)` : '';
+    list.insertAdjacentHTML('beforeend', `
+      <li style="text-align:center;">
+        <button id="historyMore" class="btn btn-ghost" style="font-size:12px;">Cargar más${remaining}</button>
+      </li>
+    `);
+    document.getElementById('historyMore')?.addEventListener('click', () => {
+      fetchHistory(true).catch(e => toast(e.message, 'error'));
+    });
+  }
 }
 
 async function fetchStats() {
@@ -296,7 +322,9 @@ async function analyze(endpoint, payload) {
 
   try {
     showLoading(true);
-    const res = await fetch(`${API}/${endpoint}`, {
+    // Versión streaming (SSE): pinta el veredicto local al momento y lo
+    // actualiza según responden los proveedores.
+    const res = await fetch(`${API}/${endpoint}/stream`, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -313,8 +341,14 @@ async function analyze(endpoint, payload) {
       throw new Error('Error en análisis');
     }
 
-    const data = await res.json();
-    displayResult(data);
+    let final = null;
+    await readSSE(res, (event, data) => {
+      showLoading(false);
+      displayResult(data);
+      if (event === 'final') final = data;
+    });
+
+    if (!final) throw new Error('Análisis interrumpido');
     await loadUserData(); // Refresh stats/history
     toast('Análisis completado', 'success');
   } catch (e) {
@@ -324,6 +358,33 @@ async function analyze(endpoint, payload) {
   }
 }
 
+// Lee una respuesta text/event-stream y llama a onEvent(event, data) por cada mensaje
+async function readSSE(res, onEvent) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let sep;
+    while ((sep = buffer.indexOf('\n\n')) !== -1) {
+      const chunk = buffer.slice(0, sep);
+      buffer = buffer.slice(sep + 2);
+
+      let event = 'message';
+      const dataLines = [];
+      chunk.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+      });
+      if (dataLines.length) onEvent(event, JSON.parse(dataLines.join('\n')));
+    }
+  }
+}
+
 function displayResult(data) {
   const resultDiv = document.getElementById('result');
   const riskBarContainer = document.getElementById('riskBarContainer');
@@ -351,6 +412,9 @@ function displayResult(data) {
   resultDiv.innerHTML = `
     <h3 style="margin:0 0 8px; color:${color}">${verdict}</h3>
     <p style="margin:0; font-size:14px;">${data.reasons ? data.reasons.join('<br>') : (data.reason || '')}</p>
+    ${data.partial && data.pending && data.pending.length
+      ? `<p style="margin:8px 0 0; font-size:12px; color:var(--text-muted);">Esperando: ${data.pending.join(', ')}…</p>`
+      : ''}
   `;
 
   if (riskBarContainer) {
@@ -0,0 +1,37 @@
+import pytest
+
+from app.services.brand_index import BrandIndex, default_protected_brands
+
+index = BrandIndex(default_protected_brands())
+
+
+@pytest.mark.parametrize("host", [
+    # dominios propios del titular
+    "www.paypal.com", "fonts.googleapis.com", "s3.amazonaws.com",
+    "lh3.googleusercontent.com", "www.paypalobjects.com", "dl.dropboxusercontent.com",
+    "outlook.live.com",
+    # la marca sola como subdominio de un sitio legítimo
+    "apple.stackexchange.com", "outlook.contoso.com", "google.github.io",
+    # palabras corrientes cerca de marcas cortas, plurales y derivados
+    "email.com", "cloud.com", "www.oranges.com", "amazons.com",
+])
+def test_legitimate_hosts_are_not_flagged(host):
+    assert index.lookup(host) is None
+
+
+@pytest.mark.parametrize("host, brand, kind", [
+    ("paypa1.com", "paypal", "homoglyph"),
+    ("g00gle.com", "google", "homoglyph"),
+    ("secure.paypa1-login.com", "paypal", "homoglyph"),
+    ("amazom.com", "amazon", "typo"),
+    ("googlee.com", "google", "typo"),
+    ("paypal-secure.com", "paypal", "embedded"),
+    ("paypal.evil.tk", "paypal", "subdomain"),
+    ("www.paypal.com.evil.net", "paypal", "subdomain"),
+    ("apple.verify-id.com", "apple", "subdomain"),
+    ("paypal.login.example.com", "paypal", "subdomain"),
+])
+def test_impersonations_are_flagged(host, brand, kind):
+    match = index.lookup(host)
+    assert match is not None
+    assert (match["brand"], match["kind"]) == (brand, kind)
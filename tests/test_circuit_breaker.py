@@ -0,0 +1,73 @@
+import asyncio
+
+from app.services.circuit_breaker import (
+    CANCEL_DEADLINE, CANCEL_DECIDED, CLOSED, OPEN, CircuitBreaker,
+)
+from app.services.singleflight import SingleFlight
+
+
+def _breaker(slow_call_seconds: float = 0.05) -> CircuitBreaker:
+    return CircuitBreaker(
+        "test", window=20, min_calls=5, failure_threshold=0.5,
+        slow_call_seconds=slow_call_seconds, open_seconds=30, half_open_max_calls=1,
+    )
+
+
+async def _hung_call(breaker: CircuitBreaker) -> None:
+    async with breaker.guard():
+        await asyncio.sleep(3600)
+
+
+async def _cancel_after(coro, delay: float, reason=None) -> None:
+    task = asyncio.create_task(coro)
+    await asyncio.sleep(delay)
+    task.cancel(reason)
+    await asyncio.gather(task, return_exceptions=True)
+
+
+def test_hung_calls_cut_by_wait_for_open_the_circuit():
+    async def scenario():
+        breaker = _breaker()
+        for _ in range(5):
+            try:
+                await asyncio.wait_for(_hung_call(breaker), timeout=0.06)
+            except asyncio.TimeoutError:
+                pass
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == OPEN
+    assert breaker.snapshot(1.0)["calls_in_window"] == 5
+
+
+def test_deadline_cancellation_counts_even_if_fast():
+    async def scenario():
+        breaker = _breaker(slow_call_seconds=60)
+        for _ in range(5):
+            await _cancel_after(_hung_call(breaker), 0.001, CANCEL_DEADLINE)
+        return breaker
+
+    assert asyncio.run(scenario()).state == OPEN
+
+
+def test_early_decision_cancellation_is_not_recorded():
+    async def scenario():
+        breaker = _breaker()
+        for _ in range(5):
+            await _cancel_after(_hung_call(breaker), 0.06, CANCEL_DECIDED)
+        return breaker
+
+    breaker = asyncio.run(scenario())
+    assert breaker.state == CLOSED
+    assert breaker.snapshot(1.0)["calls_in_window"] == 0
+
+
+def test_deadline_reason_reaches_the_breaker_through_single_flight():
+    async def scenario():
+        breaker, flights = _breaker(slow_call_seconds=60), SingleFlight()
+        for i in range(5):
+            await _cancel_after(flights.do(i, lambda: _hung_call(breaker)), 0.001, CANCEL_DEADLINE)
+        await asyncio.sleep(0.01)  # la tarea compartida termina de cancelarse
+        return breaker
+
+    assert asyncio.run(scenario()).state == OPEN
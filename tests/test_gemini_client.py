@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from app.services import gemini_client
+
+
+class _FakeCache:
+    def __init__(self):
+        self.stored = {}
+
+    async def get(self, key):
+        return self.stored.get(key)
+
+    async def put(self, key, kind, value):
+        self.stored[key] = value
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    fake = _FakeCache()
+    monkeypatch.setattr(gemini_client, "verdict_cache", fake)
+    monkeypatch.setattr(gemini_client.settings, "LLM_CACHE_ENABLED", True)
+    monkeypatch.setattr(gemini_client.settings, "GEMINI_BATCH_ENABLED", False)
+    return fake
+
+
+def _answer(monkeypatch, text_content: str) -> None:
+    async def text_single(text, *args):
+        return gemini_client._parse_provider_text_response(text_content)
+
+    async def url_single(url, *args):
+        return gemini_client._parse_url_response(text_content)
+
+    monkeypatch.setattr(gemini_client, "_analyze_text_single", text_single)
+    monkeypatch.setattr(gemini_client, "_analyze_url_single", url_single)
+
+
+@pytest.mark.parametrize("analyze", [gemini_client.analyze_text, gemini_client.analyze_url])
+def test_parsed_answers_are_cached(cache, monkeypatch, analyze):
+    _answer(monkeypatch, '{"verdict": "Phishing", "percentage": 90, "reasons": [], "score": 90}')
+    asyncio.run(analyze("contenido", gemini_key="k", gemini_url="http://gemini.test"))
+    assert len(cache.stored) == 1
+
+
+@pytest.mark.parametrize("analyze", [gemini_client.analyze_text, gemini_client.analyze_url])
+def test_unparseable_answers_are_not_cached(cache, monkeypatch, analyze):
+    _answer(monkeypatch, 'Claro, aquí tienes el análisis: {"verdict": "Phish')
+    result = asyncio.run(analyze("contenido", gemini_key="k", gemini_url="http://gemini.test"))
+    assert isinstance(result["raw"], str)
+    assert cache.stored == {}
@@ -0,0 +1,75 @@
+import asyncio
+
+from app.db import history_writer as hw_module
+from app.db.history_writer import HistoryWriter
+
+
+class _FakeDb:
+    """Sustituye a run_db: guarda los lotes y solo confirma cuando se abre `gate`."""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.batches = []
+
+    async def __call__(self, fn, entries):
+        await self.gate.wait()
+        self.batches.append(list(entries))
+
+
+def _entry(i: int) -> dict:
+    return {"username": "u", "type": "url", "content": f"http://e{i}", "verdict": "Segura"}
+
+
+def test_enqueue_returns_before_commit_and_stop_drains(monkeypatch):
+    async def scenario():
+        db = _FakeDb()
+        monkeypatch.setattr(hw_module, "run_db", db)
+        writer = HistoryWriter(max_queue=100, batch_rows=50, flush_ms=10_000)
+        writer.start()
+
+        futures = [await writer.enqueue(_entry(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        assert not any(f.done() for f in futures)  # enqueue no espera al commit
+        assert db.batches == []
+
+        db.gate.set()
+        await writer.stop()  # no espera a la ventana de 10 s
+        assert [e["content"] for batch in db.batches for e in batch] == [
+            "http://e0", "http://e1", "http://e2"
+        ]
+        assert all(f.result() is True for f in futures)
+        assert writer.stats()["queued"] == 0
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+def test_flush_writes_without_waiting_for_window(monkeypatch):
+    async def scenario():
+        db = _FakeDb()
+        db.gate.set()
+        monkeypatch.setattr(hw_module, "run_db", db)
+        writer = HistoryWriter(max_queue=100, batch_rows=50, flush_ms=10_000)
+        writer.start()
+
+        fut = await writer.enqueue(_entry(0))
+        await writer.flush()
+        assert fut.done() and db.batches == [[_entry(0)]]
+        await writer.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
+
+
+def test_rows_within_window_share_one_batch(monkeypatch):
+    async def scenario():
+        db = _FakeDb()
+        db.gate.set()
+        monkeypatch.setattr(hw_module, "run_db", db)
+        writer = HistoryWriter(max_queue=100, batch_rows=50, flush_ms=50)
+        writer.start()
+
+        futures = [await writer.enqueue(_entry(i)) for i in range(5)]
+        await asyncio.gather(*futures)
+        assert len(db.batches) == 1 and len(db.batches[0]) == 5
+        await writer.stop()
+
+    asyncio.run(asyncio.wait_for(scenario(), timeout=5))
@@ -0,0 +1,77 @@
+import random
+
+import pytest
+
+from app.services.scoring import _score_url, score_urls
+
+_PARTS = [
+    "http://", "https://", "HTTP://", "", "a", "login.", "paypa1-", "secure-",
+    "1.2.3.4", "x.tk", ".xyz", "-", "%20", "@", "<", ":8080", ":443", ":99999",
+    "/verify", "/account/update", "g00gle.com", "a.b.c.d.e", "amazom", ".com",
+    "fonts.googleapis.com/", "paypal-login.com", "email.com", "mail.",
+    "www.example.org/path?q=1", "[", "x" * 60,
+]
+
+
+def _generated_urls(n: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_PARTS) for _ in range(rng.randint(1, 8))) for _ in range(n)]
+
+
+def _expected(url: str) -> tuple:
+    try:
+        result = _score_url(url)
+    except ValueError:  # puerto no parseable: score_urls lo puntúa 50
+        return 50, "Sospechosa"
+    return result["score"], result["verdict"]
+
+
+def test_score_urls_matches_score_url():
+    urls = _generated_urls(5000)
+    batch = score_urls(urls)
+    assert [r["url"] for r in batch] == urls
+    mismatches = [
+        (url, _expected(url), (r["score"], r["verdict"]))
+        for url, r in zip(urls, batch)
+        if _expected(url) != (r["score"], r["verdict"])
+    ]
+    assert mismatches == []
+
+
+@pytest.mark.parametrize("url, score, verdict", [
+    ("https://www.example.org/", 0, "Segura"),
+    ("http://192.168.0.1/login", 73, "Maliciosa"),
+    ("http://paypa1-secure-login.tk/verify/account", 100, "Maliciosa"),
+])
+def test_score_url_known_scores(url, score, verdict):
+    result = _score_url(url)
+    assert (result["score"], result["verdict"]) == (score, verdict)
+    assert score_urls([url]) == [{"url": url, "score": score, "verdict": verdict}]
+
+
+def test_score_urls_bad_port_does_not_abort_batch():
+    assert score_urls(["http://host:99999/", "https://www.example.org/"]) == [
+        {"url": "http://host:99999/", "score": 50, "verdict": "Sospechosa"},
+        {"url": "https://www.example.org/", "score": 0, "verdict": "Segura"},
+    ]
+
+
+def test_score_text_flags_blocklisted_links(tmp_path, monkeypatch):
+    from app.services import scoring
+    from app.services.blocklist import BlocklistEngine, compile_blocklist
+
+    feed = tmp_path / "feed.txt"
+    feed.write_text("evil-tracker.example\n", encoding="utf-8")
+    compile_blocklist([str(feed)], str(tmp_path / "blocklist.bin"))
+    engine = BlocklistEngine(str(tmp_path / "blocklist.bin"))
+    engine.refresh()
+    monkeypatch.setattr(scoring, "blocklist", engine)
+
+    text = "Hola, aquí tienes la factura: https://cdn.evil-tracker.example/f/123 y https://www.example.org/"
+    result = scoring.score_text(text)
+    listed, clean = result["url_results"]
+    assert (result["percentage"], result["verdict"]) == (100, "Phishing")
+    assert listed["verdict"] == "Maliciosa"
+    assert listed["blocklist_match"] == {"match": "host", "entry": "evil-tracker.example"}
+    assert "blocklist_match" not in clean
+    assert scoring.score_text("Hola, https://www.example.org/")["verdict"] == "Seguro"